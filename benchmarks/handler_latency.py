@@ -0,0 +1,80 @@
+"""
+Measure how long the Slack-facing handlers take to answer, with the Slack
+response_url stub deliberately slow. Handlers should answer in single-digit
+milliseconds regardless, since all response_url posts happen afterwards.
+
+    python -m benchmarks.handler_latency --requests 200 --slack-latency-ms 250
+"""
+import argparse
+import asyncio
+import json
+import logging
+from urllib.parse import urlencode
+
+import httpx
+
+from benchmarks import bench_env
+from benchmarks.stub_server import StubServer
+
+
+def print_histogram(histogram, method: str, route: str):
+    snapshot = histogram.snapshot(method=method, route=route)
+    if snapshot is None:
+        print(f"{route}: no samples")
+        return
+    count = snapshot["count"]
+    print(f"{route}  count={count}  mean={snapshot['sum'] / count * 1000:.2f}ms")
+    for bound, cumulative in snapshot["buckets"].items():
+        print(f"  <= {bound * 1000:8.1f}ms  {cumulative / count:6.1%}  {'#' * int(40 * cumulative / count)}")
+
+
+async def main(args):
+    logging.basicConfig(level=logging.CRITICAL)
+    slack = StubServer(latency_ms=args.slack_latency_ms)
+    await slack.start()
+    bench_env()
+
+    from fastapi import FastAPI
+    from src.database import get_async_db
+    from src.routes import rephrase
+    from src.utils.auth import verify_slack_request
+    from src.utils.metrics import HTTP_REQUEST_LATENCY, LatencyMiddleware
+
+    app = FastAPI()
+    app.add_middleware(LatencyMiddleware)
+    app.include_router(rephrase.router)
+    app.dependency_overrides[verify_slack_request] = lambda: True
+    app.dependency_overrides[get_async_db] = lambda: None
+
+    response_url = f"{slack.base_url}/response"
+    command = urlencode({"text": "please reword this --tone formal", "user_id": "U1", "user_name": "bench", "response_url": response_url})
+    action = urlencode({"payload": json.dumps({
+        "user": {"id": "U1", "name": "bench"},
+        "response_url": response_url,
+        "actions": [{"action_id": "noop"}],
+    })})
+    headers = {"Content-Type": "application/x-www-form-urlencoded"}
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        async def post(path: str, body: str):
+            async with semaphore:
+                await client.post(path, content=body, headers=headers)
+
+        await asyncio.gather(*(
+            post(path, body)
+            for _ in range(args.requests)
+            for path, body in (("/reword", command), ("/reword-fix", command), ("/reword-action", action))
+        ))
+
+    await slack.stop()
+    for route in ("/reword", "/reword-fix", "/reword-action"):
+        print_histogram(HTTP_REQUEST_LATENCY, "POST", route)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200, help="requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--slack-latency-ms", type=float, default=250.0)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,100 @@
+"""
+Measure how long it takes to import the app and worker entry points, using
+python -X importtime in a fresh interpreter per run, and fail when a module
+goes over its budget or pulls in an SDK that should only load on first use.
+
+The budget is relative so it holds on any hardware: each module may take at
+most --max-ratio times as long as importing --reference (FastAPI by default,
+which the app cannot avoid), measured the same way on the same host.
+--budget-ms sets an absolute budget instead.
+
+    python -m benchmarks.import_time --runs 5 --max-ratio 3
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+from benchmarks import BENCH_ENV
+
+MODULES = ("src.main", "src.worker")
+# Loaded lazily by the code paths that need them
+FORBIDDEN = ("stripe", "logtail", "yoyo")
+
+IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+
+def import_profile(module: str) -> list[tuple[str, int, int]]:
+    """Return (module, depth, cumulative microseconds) in import order for one cold import of module"""
+    env = {**BENCH_ENV, **os.environ}
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, env=env
+    )
+    if result.returncode != 0:
+        errors = [line for line in result.stderr.splitlines() if not line.startswith("import time:")]
+        raise RuntimeError(f"import {module} failed:\n" + "\n".join(errors[-20:]))
+    profile = []
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            _, cumulative, indent, name = match.groups()
+            profile.append((name, len(indent) // 2, int(cumulative)))
+    return profile
+
+
+def module_imports(profile: list[tuple[str, int, int]], module: str) -> tuple[int, list[tuple[str, int, int]]]:
+    """Cumulative time of module and everything imported while importing it"""
+    end = next(index for index, (name, depth, _) in enumerate(profile) if name == module and depth == 0)
+    start = end
+    while start > 0 and profile[start - 1][1] > 0:
+        start -= 1
+    return profile[end][2], profile[start:end]
+
+
+def report(module: str, runs: int, top: int) -> tuple[float, list[str]]:
+    total, children = min(
+        (module_imports(import_profile(module), module) for _ in range(runs)),
+        key=lambda result: result[0]
+    )
+    total_ms = total / 1000
+    print(f"{module}: {total_ms:.1f}ms (best of {runs}), {len(children) + 1} modules")
+    # Direct imports of the module, slowest first
+    direct = sorted((child for child in children if child[1] == 1), key=lambda child: child[2], reverse=True)
+    for name, _, cumulative in direct[:top]:
+        print(f"  {cumulative / 1000:8.1f}ms  {name}")
+    forbidden = sorted(
+        name for name, _, _ in children
+        if any(name == package or name.startswith(f"{package}.") for package in FORBIDDEN)
+    )
+    return total_ms, forbidden
+
+
+def main(args) -> int:
+    failed = False
+    budget_ms = args.budget_ms
+    if budget_ms is None:
+        reference_ms, _ = report(args.reference, args.runs, 0)
+        budget_ms = reference_ms * args.max_ratio
+        print(f"budget: {args.max_ratio:g} x {args.reference} = {budget_ms:.0f}ms")
+    for module in args.modules:
+        total_ms, forbidden = report(module, args.runs, args.top)
+        if total_ms > budget_ms:
+            print(f"FAIL {module} took {total_ms:.1f}ms, budget is {budget_ms:.0f}ms")
+            failed = True
+        if forbidden:
+            print(f"FAIL {module} imports {', '.join(forbidden[:5])} eagerly")
+            failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("modules", nargs="*", default=list(MODULES))
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--reference", default="fastapi")
+    parser.add_argument("--max-ratio", type=float, default=3.0)
+    parser.add_argument("--budget-ms", type=float, default=None)
+    parser.add_argument("--top", type=int, default=10)
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,90 @@
+"""
+Compare a client-per-call (the old ParaphraseService behaviour) against the
+shared pooled OpenRouter client, using a local stub upstream.
+
+    python -m benchmarks.openrouter_client --requests 500 --concurrency 50 --connect-delay-ms 30
+"""
+import argparse
+import asyncio
+import itertools
+import statistics
+import time
+
+import httpx
+
+from benchmarks import bench_env
+from benchmarks.stub_server import StubServer
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def per_call_client(base_url: str, body: dict) -> None:
+    async with httpx.AsyncClient() as client:
+        response = await client.post(f"{base_url}/chat/completions", json=body)
+        response.raise_for_status()
+
+
+async def run(label: str, call, total: int, concurrency: int, server: StubServer):
+    server.reset()
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: list[float] = []
+
+    async def one():
+        async with semaphore:
+            start = time.perf_counter()
+            await call()
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(total)))
+    elapsed = time.perf_counter() - started
+    print(
+        f"{label:<18} p50={statistics.median(latencies):7.2f}ms "
+        f"p95={percentile(latencies, 95):7.2f}ms "
+        f"p99={percentile(latencies, 99):7.2f}ms "
+        f"throughput={total / elapsed:8.1f} req/s "
+        f"connections={server.connections} requests={server.requests}"
+    )
+
+
+async def main(args):
+    server = StubServer(latency_ms=args.latency_ms, connect_delay_ms=args.connect_delay_ms)
+    await server.start()
+    # Admission control would otherwise cap the anonymous benchmark user below --concurrency
+    bench_env(
+        OPENROUTER_BASE_URL=server.base_url,
+        ADMISSION_MAX_IN_FLIGHT=str(args.concurrency),
+        ADMISSION_MAX_PER_USER=str(args.concurrency)
+    )
+
+    from src.services.http import open_http_clients, close_http_clients
+    from src.services.paraphrase import ParaphraseService
+
+    body = ParaphraseService.prompt_body("paraphrase", "Hello there")
+    await run("client-per-call", lambda: per_call_client(server.base_url, body), args.requests, args.concurrency, server)
+
+    await open_http_clients()
+    # Distinct texts so single-flight cannot coalesce concurrent calls into one upstream request
+    counter = itertools.count()
+    try:
+        await run(
+            "shared client",
+            lambda: ParaphraseService().paraphrase(f"Hello there {next(counter)}", use_cache=False),
+            args.requests, args.concurrency, server
+        )
+    finally:
+        await close_http_clients()
+        await server.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--latency-ms", type=float, default=5.0, help="stub upstream processing time")
+    parser.add_argument("--connect-delay-ms", type=float, default=30.0, help="simulated handshake cost per new connection")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,82 @@
+"""
+Minimal keep-alive HTTP/1.1 stub standing in for OpenRouter and Slack's
+response_url endpoints. It counts accepted TCP connections so benchmarks
+can compare socket churn between client strategies.
+"""
+import asyncio
+import json
+from typing import Optional
+
+COMPLETION_BODY = json.dumps({
+    "id": "stub",
+    "model": "stub/model",
+    "choices": [
+        {"message": {"role": "assistant", "content": "Stubbed rewrite."}, "finish_reason": "stop"}
+    ],
+    "usage": {"prompt_tokens": 10, "completion_tokens": 3, "total_tokens": 13},
+}).encode()
+
+
+class StubServer:
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency_ms: float = 5.0, connect_delay_ms: float = 0.0):
+        self.host = host
+        self.port = port
+        self.latency = latency_ms / 1000
+        self.connect_delay = connect_delay_ms / 1000
+        self.connections = 0
+        self.requests = 0
+        self._server: Optional[asyncio.base_events.Server] = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def reset(self):
+        self.connections = 0
+        self.requests = 0
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        if self.connect_delay:
+            # Stand-in for the TLS handshake a real upstream would cost
+            await asyncio.sleep(self.connect_delay)
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                content_length = 0
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    if name.strip().lower() == "content-length":
+                        content_length = int(value.strip())
+                if content_length:
+                    await reader.readexactly(content_length)
+                self.requests += 1
+                if self.latency:
+                    await asyncio.sleep(self.latency)
+                path = request_line.split()[1]
+                body = COMPLETION_BODY if path.endswith(b"/chat/completions") else b'{"ok": true}'
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\n"
+                    b"Content-Type: application/json\r\n"
+                    b"Content-Length: " + str(len(body)).encode() + b"\r\n"
+                    b"Connection: keep-alive\r\n\r\n" + body
+                )
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
@@ -0,0 +1,20 @@
+"""
+Restore credits_assigned and credits_used columns on users table
+"""
+
+from yoyo import step
+
+__depends__ = {'0010_make_user_name_nullable'}
+
+steps = [
+    step(
+        """
+        ALTER TABLE users ADD COLUMN IF NOT EXISTS credits_assigned INT NOT NULL DEFAULT 50;
+        ALTER TABLE users ADD COLUMN IF NOT EXISTS credits_used INT NOT NULL DEFAULT 0;
+        """,
+        """
+        ALTER TABLE users DROP COLUMN IF EXISTS credits_assigned;
+        ALTER TABLE users DROP COLUMN IF EXISTS credits_used;
+        """
+    )
+]
@@ -0,0 +1,18 @@
+"""
+Add credits_reserved column to users table for in-flight credit holds
+"""
+
+from yoyo import step
+
+__depends__ = {'0011_restore_user_credits'}
+
+steps = [
+    step(
+        """
+        ALTER TABLE users ADD COLUMN IF NOT EXISTS credits_reserved INT NOT NULL DEFAULT 0;
+        """,
+        """
+        ALTER TABLE users DROP COLUMN IF EXISTS credits_reserved;
+        """
+    )
+]
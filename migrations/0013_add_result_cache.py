@@ -0,0 +1,24 @@
+"""
+Add paraphrase_results table backing the shared model result cache
+"""
+
+from yoyo import step
+
+__depends__ = {'0012_add_credits_reserved'}
+
+steps = [
+    step(
+        """
+        CREATE TABLE IF NOT EXISTS paraphrase_results (
+            key VARCHAR(64) PRIMARY KEY,
+            operation VARCHAR NOT NULL,
+            result TEXT NOT NULL,
+            created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+        );
+        CREATE INDEX IF NOT EXISTS idx_paraphrase_results_created_at ON paraphrase_results(created_at);
+        """,
+        """
+        DROP TABLE IF EXISTS paraphrase_results;
+        """
+    )
+]
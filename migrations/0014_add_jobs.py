@@ -0,0 +1,31 @@
+"""
+Add jobs table backing the durable background job queue
+"""
+
+from yoyo import step
+
+__depends__ = {'0013_add_result_cache'}
+
+steps = [
+    step(
+        """
+        CREATE TABLE IF NOT EXISTS jobs (
+            id UUID PRIMARY KEY,
+            kind VARCHAR NOT NULL,
+            payload JSONB NOT NULL,
+            status VARCHAR NOT NULL DEFAULT 'queued',
+            attempts INT NOT NULL DEFAULT 0,
+            max_attempts INT NOT NULL,
+            run_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            locked_until TIMESTAMP,
+            last_error TEXT,
+            created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+        );
+        CREATE INDEX IF NOT EXISTS idx_jobs_status_run_at ON jobs(status, run_at);
+        """,
+        """
+        DROP TABLE IF EXISTS jobs;
+        """
+    )
+]
@@ -0,0 +1,22 @@
+"""
+Add rate_limit_buckets table for the shared token-bucket rate limiter
+"""
+
+from yoyo import step
+
+__depends__ = {'0014_add_jobs'}
+
+steps = [
+    step(
+        """
+        CREATE TABLE IF NOT EXISTS rate_limit_buckets (
+            key VARCHAR PRIMARY KEY,
+            tokens DOUBLE PRECISION NOT NULL,
+            updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        );
+        """,
+        """
+        DROP TABLE IF EXISTS rate_limit_buckets;
+        """
+    )
+]
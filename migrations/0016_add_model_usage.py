@@ -0,0 +1,29 @@
+"""
+Add model_usage table recording token counts and latency per upstream model call
+"""
+
+from yoyo import step
+
+__depends__ = {'0015_add_rate_limit_buckets'}
+
+steps = [
+    step(
+        """
+        CREATE TABLE IF NOT EXISTS model_usage (
+            id UUID PRIMARY KEY,
+            slack_user_id VARCHAR,
+            model VARCHAR NOT NULL,
+            operation VARCHAR NOT NULL,
+            prompt_tokens INTEGER NOT NULL DEFAULT 0,
+            completion_tokens INTEGER NOT NULL DEFAULT 0,
+            latency_ms INTEGER NOT NULL,
+            created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+        );
+        CREATE INDEX IF NOT EXISTS idx_model_usage_created_at ON model_usage(created_at);
+        CREATE INDEX IF NOT EXISTS idx_model_usage_user_created_at ON model_usage(slack_user_id, created_at);
+        """,
+        """
+        DROP TABLE IF EXISTS model_usage;
+        """
+    )
+]
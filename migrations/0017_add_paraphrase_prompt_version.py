@@ -0,0 +1,18 @@
+"""
+Record which prompt template version produced each paraphrase
+"""
+
+from yoyo import step
+
+__depends__ = {'0016_add_model_usage'}
+
+steps = [
+    step(
+        """
+        ALTER TABLE paraphrases ADD COLUMN IF NOT EXISTS prompt_version VARCHAR;
+        """,
+        """
+        ALTER TABLE paraphrases DROP COLUMN IF EXISTS prompt_version;
+        """
+    )
+]
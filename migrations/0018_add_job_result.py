@@ -0,0 +1,18 @@
+"""
+Store a job's result with the credit charge so a redelivered job only re-posts it
+"""
+
+from yoyo import step
+
+__depends__ = {'0017_add_paraphrase_prompt_version'}
+
+steps = [
+    step(
+        """
+        ALTER TABLE jobs ADD COLUMN IF NOT EXISTS result TEXT;
+        """,
+        """
+        ALTER TABLE jobs DROP COLUMN IF EXISTS result;
+        """
+    )
+]
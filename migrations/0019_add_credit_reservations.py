@@ -0,0 +1,27 @@
+"""
+Record each credit hold so holds of crashed workers can be handed back
+"""
+
+from yoyo import step
+
+__depends__ = {'0018_add_job_result'}
+
+steps = [
+    step(
+        """
+        CREATE TABLE IF NOT EXISTS credit_reservations (
+            id UUID PRIMARY KEY,
+            user_id UUID NOT NULL REFERENCES users(id),
+            amount INT NOT NULL,
+            job_id UUID,
+            expires_at TIMESTAMP NOT NULL,
+            created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+        );
+        CREATE INDEX IF NOT EXISTS idx_credit_reservations_expires_at ON credit_reservations(expires_at);
+        CREATE INDEX IF NOT EXISTS idx_credit_reservations_job_id ON credit_reservations(job_id);
+        """,
+        """
+        DROP TABLE IF EXISTS credit_reservations;
+        """
+    )
+]
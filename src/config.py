@@ -23,7 +23,142 @@ class Settings(BaseSettings):
     stripe_secret_key: str
     stripe_webhook_secret: str
 
+    # Logging pipeline
+    log_level: str = "INFO"
+    log_format: str = "json"  # json or text, for the app.log handler
+    log_queue_size: int = 10000
+
+    # Shared OpenRouter HTTP client
+    openrouter_http2: bool = True
+    openrouter_max_connections: int = 100
+    openrouter_max_keepalive_connections: int = 20
+    openrouter_keepalive_expiry: float = 30.0
+    openrouter_timeout: float = 30.0
+    openrouter_connect_timeout: float = 5.0
+
+    # Multi-model routing
+    openrouter_fallback_models: list[str] = []
+    openrouter_model_timeouts: dict[str, float] = {}
+    openrouter_hedge: bool = True
+    openrouter_hedge_min_delay: float = 0.5
+    router_stats_window: int = 200
+    router_stats_min_samples: int = 20
+    router_max_error_rate: float = 0.5
+
+    # Circuit breakers for upstream hosts
+    circuit_failure_threshold: int = 5
+    circuit_recovery_timeout: float = 30.0
+    circuit_half_open_max_calls: int = 1
+
+    # Slack response_url dispatcher
+    slack_http2: bool = True
+    slack_max_connections: int = 50
+    slack_max_keepalive_connections: int = 20
+    slack_keepalive_expiry: float = 30.0
+    slack_timeout: float = 10.0
+    slack_connect_timeout: float = 5.0
+    slack_max_concurrency: int = 50
+    slack_max_retries: int = 3
+    slack_retry_base_delay: float = 0.5
+    slack_retry_max_delay: float = 30.0
+
+    # Streaming responses
+    openrouter_stream: bool = False
+    slack_stream_update_interval: float = 1.0
+
+    # Async database engine
+    db_pool_size: int = 20
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 30.0
+    db_pool_recycle: int = 1800
+    db_statement_timeout_ms: int = 10000
+
+    # Credit holds
+    credit_hold_timeout: float = 60.0
+
+    # In-process user cache
+    user_cache_size: int = 10000
+    user_cache_ttl: float = 300.0
+
+    # Token accounting and completion budget
+    usage_tracking_enabled: bool = True
+    usage_batch_size: int = 100
+    usage_flush_interval: float = 5.0
+    completion_token_ratio: float = 2.0
+    completion_token_floor: int = 64
+    completion_token_cap: int = 2048
+    admin_api_token: str | None = None
+
+    # Batch paraphrase API
+    batch_max_items: int = 500
+    batch_timeout: float = 300.0
+
+    # Long text chunking
+    text_chunk_max_chars: int = 2000
+    text_chunk_concurrency: int = 4
+
+    # Paraphrase result cache
+    result_cache_size: int = 5000
+    result_cache_ttl: float = 3600.0
+    result_cache_db: bool = False
+    result_cache_db_ttl: float = 604800.0
+
+    # Per-user and per-workspace rate limits
+    rate_limit_enabled: bool = True
+    rate_limit_backend: str = "memory"
+    rate_limit_user_capacity: float = 10.0
+    rate_limit_user_refill_per_second: float = 0.2
+    rate_limit_team_capacity: float = 200.0
+    rate_limit_team_refill_per_second: float = 5.0
+    rate_limit_max_keys: int = 50000
+
+    # Admission control for upstream model calls
+    admission_max_in_flight: int = 32
+    admission_max_queue: int = 100
+    admission_max_per_user: int = 4
+    admission_queue_timeout: float = 10.0
+
+    # Durable job queue
+    job_queue_enabled: bool = True
+    job_worker_concurrency: int = 10
+    job_visibility_timeout: float = 120.0
+    job_max_attempts: int = 3
+    job_retry_base_delay: float = 2.0
+    job_poll_interval: float = 0.5
+    job_sweep_interval: float = 60.0
+
+    # Refuse to start when migrations are missing; apply them with python -m src.migrate
+    schema_check_enabled: bool = True
+
+    # Metrics; with several worker processes each publishes snapshots to metrics_dir
+    metrics_dir: str | None = None
+    metrics_export_interval: float = 5.0
+
+    # Production server (python -m src.server)
+    server_host: str = "0.0.0.0"
+    server_port: int = 8000
+    server_workers: int = 0  # 0 runs one worker per CPU
+    server_keepalive: int = 5
+    server_backlog: int = 2048
+    server_timeout: int = 60
+    server_graceful_timeout: int = 30
+
     class Config:       
         env_file = ".env"
 
-settings = Settings() 
\ No newline at end of file
+_settings: Settings | None = None
+
+def get_settings() -> Settings:
+    """Read and validate the environment on first use rather than at import"""
+    global _settings
+    if _settings is None:
+        _settings = Settings()
+    return _settings
+
+class LazySettings:
+    """Stand-in for the Settings instance that builds it on first attribute access"""
+
+    def __getattr__(self, name: str):
+        return getattr(get_settings(), name)
+
+settings = LazySettings() 
\ No newline at end of file
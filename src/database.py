@@ -1,12 +1,62 @@
-from sqlalchemy import create_engine
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, declarative_base, sessionmaker
 from src.config import settings
+from src.utils.metrics import DB_POOL_CHECKOUT_WAIT, DB_POOL_CONNECTIONS
 
-SQLALCHEMY_DATABASE_URL = settings.database_url
+def get_async_database_url(url: str) -> str:
+    """Point a postgres URL at the asyncpg driver"""
+    scheme, _, rest = url.partition("://")
+    if scheme in ("postgres", "postgresql") or scheme.startswith("postgresql+"):
+        return f"postgresql+asyncpg://{rest}"
+    return url
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Engines are created on first use so importing models or routes does not load the drivers
+_engine: Engine | None = None
+_session_factory: sessionmaker | None = None
+_async_engine: AsyncEngine | None = None
+_async_session_factory: async_sessionmaker | None = None
+
+def get_engine() -> Engine:
+    global _engine
+    if _engine is None:
+        from sqlalchemy import create_engine
+        _engine = create_engine(settings.database_url)
+    return _engine
+
+def SessionLocal() -> Session:
+    """Open a sync session; the caller closes it"""
+    global _session_factory
+    if _session_factory is None:
+        _session_factory = sessionmaker(autocommit=False, autoflush=False, bind=get_engine())
+    return _session_factory()
+
+def get_async_engine() -> AsyncEngine:
+    global _async_engine
+    if _async_engine is None:
+        _async_engine = create_async_engine(
+            get_async_database_url(settings.database_url),
+            pool_size=settings.db_pool_size,
+            max_overflow=settings.db_max_overflow,
+            pool_timeout=settings.db_pool_timeout,
+            pool_recycle=settings.db_pool_recycle,
+            pool_pre_ping=True,
+            connect_args={"server_settings": {"statement_timeout": str(settings.db_statement_timeout_ms)}},
+        )
+        pool = _async_engine.pool
+        DB_POOL_CONNECTIONS.set_function(lambda: pool.checkedout(), state="checked_out")
+        DB_POOL_CONNECTIONS.set_function(lambda: pool.checkedin(), state="idle")
+        DB_POOL_CONNECTIONS.set_function(lambda: max(0, pool.overflow()), state="overflow")
+    return _async_engine
+
+def AsyncSessionLocal() -> AsyncSession:
+    """Open an async session; use it as an async context manager"""
+    global _async_session_factory
+    if _async_session_factory is None:
+        _async_session_factory = async_sessionmaker(get_async_engine(), class_=AsyncSession, expire_on_commit=False)
+    return _async_session_factory()
 
 Base = declarative_base()
 
@@ -16,4 +66,24 @@ def get_db():
     try:
         yield db
     finally:
-        db.close() 
\ No newline at end of file
+        db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+@asynccontextmanager
+async def async_session_scope() -> AsyncIterator[AsyncSession]:
+    """Open a session owned by the caller, for work that outlives the request"""
+    async with AsyncSessionLocal() as db:
+        # Check out eagerly so the pool wait is measured on its own
+        with DB_POOL_CHECKOUT_WAIT.time():
+            await db.connection()
+        yield db
+
+async def close_async_engine():
+    global _async_engine, _async_session_factory
+    if _async_engine is not None:
+        await _async_engine.dispose()
+        _async_engine = None
+        _async_session_factory = None
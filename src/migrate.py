@@ -0,0 +1,51 @@
+"""
+Apply pending database migrations. Run once per deploy, before starting the
+API or worker processes:
+
+    python -m src.migrate
+"""
+import logging
+import os
+from sqlalchemy import text
+from src.config import settings
+from src.database import get_async_engine
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_DIR = "migrations"
+
+
+def latest_migration() -> str:
+    """Id of the newest migration shipped with this build, from file names alone"""
+    ids = [name[:-3] for name in os.listdir(MIGRATIONS_DIR) if name.endswith(".py") and not name.startswith("_")]
+    return max(ids)
+
+
+async def check_schema():
+    """Fail startup if the newest migration has not been applied, with a single indexed lookup"""
+    head = latest_migration()
+    async with get_async_engine().connect() as conn:
+        result = await conn.execute(
+            text("SELECT 1 FROM _yoyo_migration WHERE migration_id = :head"),
+            {"head": head}
+        )
+        if result.first() is None:
+            raise RuntimeError(f"Database schema is not at {head}; run python -m src.migrate")
+
+
+def apply_migrations():
+    # Imported here so the API and workers never load yoyo
+    from yoyo import get_backend, read_migrations
+
+    backend = get_backend(settings.database_url)
+    migrations = read_migrations(MIGRATIONS_DIR)
+    # The lock makes concurrent runs (e.g. several containers starting) wait for each other
+    with backend.lock():
+        pending = backend.to_apply(migrations)
+        backend.apply_migrations(pending)
+    logger.info("Applied %d migrations", len(pending))
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    apply_migrations()
@@ -1,8 +1,10 @@
-from .paraphrase import ParaphraseRequest, ParaphraseResponse
+from .paraphrase import ParaphraseRequest, ParaphraseResponse, BatchParaphraseRequest, BatchParaphraseResponse
 from .slack import SlackOAuthResponse
 
 __all__ = [
     'ParaphraseRequest',
     'ParaphraseResponse',
+    'BatchParaphraseRequest',
+    'BatchParaphraseResponse',
     'SlackOAuthResponse'
 ] 
\ No newline at end of file
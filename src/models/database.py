@@ -2,19 +2,27 @@ from sqlalchemy import Column, String, Text, DateTime, ForeignKey, Integer, JSON
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from src.database import Base
+from src.utils.constants import FREE_CREDITS
 from datetime import datetime, timezone
 import uuid
 
+def utcnow() -> datetime:
+    # Columns are TIMESTAMP WITHOUT TIME ZONE; asyncpg refuses aware datetimes for them
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
 class User(Base):
     __tablename__ = "users"
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     slack_user_id = Column(String, unique=True, nullable=False)
-    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+    created_at = Column(DateTime, default=utcnow)
     user_name = Column(String, nullable=False)
     email = Column(String(255), unique=True, nullable=True)
     plan = Column(String, default="free")
     user_info = Column(JSON, nullable=True)
+    credits_assigned = Column(Integer, nullable=False, default=FREE_CREDITS)
+    credits_used = Column(Integer, nullable=False, default=0)
+    credits_reserved = Column(Integer, nullable=False, default=0)
     paraphrases = relationship("Paraphrase", back_populates="user")
 
 class Paraphrase(Base):
@@ -24,8 +32,57 @@ class Paraphrase(Base):
     original_text = Column(Text, nullable=False)
     paraphrased_text = Column(Text, nullable=False)
     tone = Column(String)
+    prompt_version = Column(String, nullable=True)
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
-    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
-    updated_at = Column(DateTime, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
+    created_at = Column(DateTime, default=utcnow)
+    updated_at = Column(DateTime, default=utcnow, onupdate=utcnow)
     
-    user = relationship("User", back_populates="paraphrases") 
\ No newline at end of file
+    user = relationship("User", back_populates="paraphrases")
+
+class CreditReservation(Base):
+    __tablename__ = "credit_reservations"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
+    amount = Column(Integer, nullable=False)
+    # Queued job holding the credits, so they can be handed back when the job is redelivered
+    job_id = Column(UUID(as_uuid=True), nullable=True)
+    expires_at = Column(DateTime, nullable=False)
+    created_at = Column(DateTime, nullable=False, default=utcnow)
+
+class CachedResult(Base):
+    __tablename__ = "paraphrase_results"
+
+    key = Column(String(64), primary_key=True)
+    operation = Column(String, nullable=False)
+    result = Column(Text, nullable=False)
+    created_at = Column(DateTime, nullable=False, default=utcnow)
+
+class Job(Base):
+    __tablename__ = "jobs"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    kind = Column(String, nullable=False)
+    payload = Column(JSON, nullable=False)
+    status = Column(String, nullable=False, default="queued")
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False)
+    run_at = Column(DateTime, nullable=False, default=utcnow)
+    locked_until = Column(DateTime, nullable=True)
+    last_error = Column(Text, nullable=True)
+    # Set in the transaction that charged for it, so a redelivered job skips straight to posting it
+    result = Column(Text, nullable=True)
+    created_at = Column(DateTime, nullable=False, default=utcnow)
+    updated_at = Column(DateTime, nullable=False, default=utcnow, onupdate=utcnow)
+
+class ModelUsage(Base):
+    __tablename__ = "model_usage"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    slack_user_id = Column(String, nullable=True)
+    model = Column(String, nullable=False)
+    operation = Column(String, nullable=False)
+    prompt_tokens = Column(Integer, nullable=False, default=0)
+    completion_tokens = Column(Integer, nullable=False, default=0)
+    latency_ms = Column(Integer, nullable=False)
+    created_at = Column(DateTime, nullable=False, default=utcnow)
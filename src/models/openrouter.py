@@ -9,8 +9,27 @@ class OpenRouterChoice(BaseModel):
     message: OpenRouterMessage
     finish_reason: str
 
+class OpenRouterUsage(BaseModel):
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    total_tokens: int = 0
+
 class OpenRouterResponse(BaseModel):
     id: str
     model: str
     choices: List[OpenRouterChoice]
-    usage: dict 
\ No newline at end of file
+    usage: Optional[OpenRouterUsage] = None
+
+class OpenRouterDelta(BaseModel):
+    role: Optional[str] = None
+    content: Optional[str] = None
+
+class OpenRouterStreamChoice(BaseModel):
+    delta: OpenRouterDelta
+    finish_reason: Optional[str] = None
+
+class OpenRouterStreamChunk(BaseModel):
+    id: str
+    model: str
+    choices: List[OpenRouterStreamChoice]
+    usage: Optional[OpenRouterUsage] = None
@@ -1,7 +1,20 @@
-from pydantic import BaseModel
+from typing import List, Literal, Optional
+from pydantic import BaseModel, Field
 
 class ParaphraseRequest(BaseModel):
-    text: str
+    text: str = Field(..., min_length=1)
+    tone: Optional[str] = None
+    operation: Literal["paraphrase", "fix"] = "paraphrase"
 
 class ParaphraseResponse(BaseModel):
-    paraphrased_text: str 
\ No newline at end of file
+    paraphrased_text: Optional[str] = None
+    error: Optional[str] = None
+
+class BatchParaphraseRequest(BaseModel):
+    user_id: str = Field(..., description="Slack user ID whose credits pay for the batch")
+    user_name: Optional[str] = None
+    items: List[ParaphraseRequest] = Field(..., min_length=1)
+
+class BatchParaphraseResponse(BaseModel):
+    results: List[ParaphraseResponse]
+    credits_used: int
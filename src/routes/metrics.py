@@ -0,0 +1,10 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from src.services.metrics import collect_metrics
+
+router = APIRouter()
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus scrape endpoint covering every worker process"""
+    return PlainTextResponse(await collect_metrics(), media_type="text/plain; version=0.0.4")
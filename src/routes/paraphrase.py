@@ -0,0 +1,96 @@
+import asyncio
+import logging
+import math
+from fastapi import APIRouter, Header, HTTPException
+from src.models.paraphrase import BatchParaphraseRequest, BatchParaphraseResponse, ParaphraseRequest, ParaphraseResponse
+from src.services.admission import BUSY_MESSAGE, AdmissionRejected
+from src.services.credits import CreditLedger
+from src.services.database import AsyncDatabaseService, cache_user
+from src.services.paraphrase import ParaphraseService
+from src.services.prompts import normalize_tone
+from src.services.result_cache import key_text
+from src.utils.auth import verify_admin_token
+from src.utils.log import bind_log_context
+from src.database import async_session_scope
+from src.config import settings
+
+router = APIRouter(prefix="/paraphrase", tags=["paraphrase"])
+logger = logging.getLogger(__name__)
+
+@router.post("/batch", response_model=BatchParaphraseResponse)
+async def paraphrase_batch(request: BatchParaphraseRequest, authorization: str | None = Header(default=None)):
+    """Rewrite many texts in one call for internal tools.
+
+    Identical items run once and cost one credit. Credits for all distinct items
+    are held up front and only successful ones are charged. Results come back
+    in request order; failed items carry an error instead of text.
+    """
+    verify_admin_token(authorization)
+    bind_log_context(user_id=request.user_id)
+    if len(request.items) > settings.batch_max_items:
+        raise HTTPException(status_code=413, detail=f"A batch may contain at most {settings.batch_max_items} items")
+
+    # Run each distinct item once and remember where every request item's result is
+    unique: dict[tuple, int] = {}
+    items: list[ParaphraseRequest] = []
+    positions: list[int] = []
+    for item in request.items:
+        key = batch_item_key(item)
+        if key not in unique:
+            unique[key] = len(items)
+            items.append(item)
+        positions.append(unique[key])
+
+    try:
+        async with async_session_scope() as db:
+            db_service = AsyncDatabaseService(db)
+            user = await db_service.get_or_create_user(request.user_id, request.user_name)
+            ledger = CreditLedger(db)
+            async with ledger.hold(user, len(items), timeout=settings.batch_timeout) as hold:
+                if not hold.reserved:
+                    raise HTTPException(status_code=402, detail=f"Not enough credits left for {len(items)} items")
+
+                # The service queues its model calls to stay within the per-user admission limit
+                paraphrase_service = ParaphraseService(request.user_id)
+                results = await asyncio.gather(
+                    *(run_batch_item(paraphrase_service, item, request.user_id) for item in items)
+                )
+
+                # Charge the successful items and release the rest of the hold in one transaction
+                charged = sum(1 for result in results if result.paraphrased_text)
+                await ledger.commit(hold, charged)
+                cache_user(user)
+    except TimeoutError:
+        # The items could not all be admitted and answered within batch_timeout; the hold was released
+        logger.warning("Batch of %s items for user %s timed out", len(items), request.user_id)
+        raise HTTPException(
+            status_code=503,
+            detail=BUSY_MESSAGE,
+            headers={"Retry-After": str(math.ceil(settings.admission_queue_timeout))}
+        )
+
+    logger.info("Processed batch of %s items (%s distinct, %s succeeded) for user %s", len(request.items), len(items), charged, request.user_id)
+    return BatchParaphraseResponse(results=[results[index] for index in positions], credits_used=charged)
+
+async def run_batch_item(
+    paraphrase_service: ParaphraseService,
+    item: ParaphraseRequest,
+    user_id: str
+) -> ParaphraseResponse:
+    try:
+        if item.operation == "fix":
+            text = await paraphrase_service.fix_text(item.text)
+        else:
+            text = await paraphrase_service.paraphrase(item.text, item.tone)
+    except AdmissionRejected as e:
+        return ParaphraseResponse(error=str(e))
+    except Exception as e:
+        logger.error("Error in batch %s for user %s: %s", item.operation, user_id, e)
+        return ParaphraseResponse(error="Error processing item")
+    if not text:
+        return ParaphraseResponse(error="Failed to get rephrased text")
+    return ParaphraseResponse(paraphrased_text=text)
+
+def batch_item_key(item: ParaphraseRequest) -> tuple:
+    tone = normalize_tone(item.tone) if item.operation == "paraphrase" else None
+    return (item.operation, key_text(item.operation, item.text), tone)
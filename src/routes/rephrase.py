@@ -1,16 +1,24 @@
 import json
 import logging
+from typing import AsyncIterator, Awaitable, Callable, Optional
 from fastapi import APIRouter, Depends, HTTPException, Request, BackgroundTasks
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.services.paraphrase import ParaphraseService
-from src.services.database import DatabaseService
-from src.services.slack import SlackService
+from src.services.prompts import prompt_version
+from src.services.database import AsyncDatabaseService
+from src.services.credits import CreditLedger
+from src.services.jobs import current_job, dispatch_job, is_final_attempt, job_handler
+from src.services.admission import AdmissionRejected
+from src.services.rate_limit import RATE_LIMITED_MESSAGE, allow_request
+from src.services.slack import SlackService, get_slack_service
 from src.utils.text import parse_command, get_latest_paraphrase
 from src.utils.request import parse_request
-from src.utils.layout import get_rephrase_response_layout, get_processing_layout, get_error_layout, get_acknowledgment_layout
-from src.utils.auth import verify_slack_request, check_user_credits
-from src.database import get_db     
+from src.utils.layout import get_rephrase_response_layout, get_processing_layout, get_error_layout, get_acknowledgment_layout, get_streaming_layout
+from src.utils.auth import verify_slack_request
+from src.utils.log import bind_log_context
+from src.database import get_async_db, async_session_scope
+from src.config import settings
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -20,7 +28,6 @@ logger = logging.getLogger(__name__)
 async def reword(
     request: Request,
     background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db),
     is_verified: bool = Depends(verify_slack_request)
 ):
     if not is_verified:
@@ -28,48 +35,50 @@ async def reword(
         raise HTTPException(status_code=401, detail="Unauthorized")
     
     try:
-        text, user_id, user_name, response_url = await parse_request(request)
+        text, user_id, user_name, response_url, team_id = await parse_request(request)
+        bind_log_context(user_id=user_id, team_id=team_id)
         if not text:
-            logger.error(f"No text found in form data for user {user_id}")
+            logger.error("No text found in form data for user %s", user_id)
             return get_error_layout("Missing text")
         if not user_id:
-            logger.error(f"No user_id found in form data for user {user_id}")
+            logger.error("No user_id found in form data for user %s", user_id)
             return get_error_layout("Missing user_id")
         if not response_url:
-            logger.error(f"No response_url found in form data for user {user_id}")
+            logger.error("No response_url found in form data for user %s", user_id)
             return get_error_layout("Missing response_url")
+        if not await allow_request(user_id, team_id):
+            logger.warning("Rate limited reword request for user %s", user_id)
+            return get_error_layout(RATE_LIMITED_MESSAGE, text)
         
         text_to_rephrase, tone = parse_command(text)     
 
-        slack_service = SlackService()
-        payload = get_acknowledgment_payload(user_id, response_url)
-        await send_action_response(payload, "acknowledgment", slack_service, response_url)
-        logger.info(f"Sent acknowledgment for user {user_id} for reword")
+        # The processing layout returned below is the acknowledgment; posting
+        # another one to response_url here would put Slack I/O on the 3s path
         
-        # Add background task to do the actual work
-        background_tasks.add_task(
-            process_paraphrase_task,
+        # Queue a job to do the actual work
+        await dispatch_job(
+            background_tasks,
+            "paraphrase",
             text_to_rephrase=text_to_rephrase,
             tone=tone, 
             user_id=user_id,
             user_name=user_name,
-            response_url=response_url,
-            db_session=db
+            response_url=response_url
         )
         
         # Return an immediate response (within 3 seconds) to Slack
-        logger.info(f"Added reword task to background for user {user_id}")
+        logger.info("Queued reword job for user %s", user_id)
         return get_processing_layout()
         
     except Exception as e:
-        logger.error(f"Error processing reword request for user {user_id}: {str(e)}", exc_info=True)
+        logger.error("Error processing reword request for user %s: %s", user_id, e, exc_info=True)
         return get_error_layout("Error processing request")
 
 @router.post("/reword-action")
 async def reword_action(
     request: Request,
     background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     is_verified: bool = Depends(verify_slack_request)
 ):
     if not is_verified:
@@ -83,25 +92,28 @@ async def reword_action(
             logger.error("No payload found in form data")
             return get_error_layout("Missing payload")
             
-        slack_service = SlackService()
+        slack_service = get_slack_service()
         payload_data = json.loads(payload)
         user_id = payload_data["user"]["id"]
         user_name = payload_data["user"]["name"]
         response_url = payload_data["response_url"]
         action_id = payload_data["actions"][0]["action_id"]
+        team_id = payload_data.get("team", {}).get("id") or payload_data["user"].get("team_id")
+        bind_log_context(user_id=user_id, team_id=team_id)
+        if not await allow_request(user_id, team_id):
+            logger.warning("Rate limited reword-action request for user %s", user_id)
+            return get_error_layout(RATE_LIMITED_MESSAGE, "")
     
-        # Send immediate acknowledgment
-        payload = get_acknowledgment_payload(user_id, response_url)
-        await send_action_response(payload, "acknowledgment", slack_service, response_url)
-        logger.info(f"Sent acknowledgment for user {user_id} for reword-action")
-        
+        # Posted after we have answered Slack, off the 3s path
+        acknowledgment = get_acknowledgment_payload(user_id, response_url)
+
         if action_id == "rewrite_button":
             logger.info("Received rewrite_button action")
             
             # Get the latest paraphrase for this user
-            db_service = DatabaseService(db)
-            user = db_service.get_or_create_user(user_id, user_name)
-            latest_paraphrases = db_service.get_user_paraphrases(user.id, limit=1)
+            db_service = AsyncDatabaseService(db)
+            user = await db_service.get_or_create_user(user_id, user_name)
+            latest_paraphrases = await db_service.get_user_paraphrases(user.id, limit=1)
             
             if not latest_paraphrases:
                 logger.error("No previous paraphrases found for user")
@@ -118,29 +130,35 @@ async def reword_action(
                     if tone:
                         tone = tone.strip()
             
-            # Add background task to process the rewrite
+            # Queue the rewrite only once the acknowledgment is posted, so a fast
+            # worker cannot post its answer first or have it replaced by the acknowledgment
             background_tasks.add_task(
-                process_rewrite_action_task,
+                acknowledge_then_dispatch,
+                background_tasks,
+                acknowledgment,
+                slack_service,
+                "rewrite_action",
                 original_text=original_text,
                 user_id=user_id,
                 user_name=user_name,
                 response_url=response_url,
-                db_session=db,
                 tone=tone
             )
+            logger.info("Queued acknowledgment and rewrite job for user %s", user_id)
             
             # Return immediate response
             return {}
 
+        background_tasks.add_task(send_action_response, acknowledgment, "acknowledgment", slack_service, response_url)
+
     except Exception as e:
-        logger.error(f"Error processing reword-action request for user {user_id}: {str(e)}", exc_info=True)
+        logger.error("Error processing reword-action request for user %s: %s", user_id, e, exc_info=True)
         return get_error_layout("Error processing request")
 
 @router.post("/reword-fix")
 async def reword_fix(
     request: Request,
     background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db),
     is_verified: bool = Depends(verify_slack_request)
 ):
     if not is_verified:
@@ -148,188 +166,268 @@ async def reword_fix(
         return get_error_layout("Unauthorized")
     
     try:
-        text, user_id, user_name, response_url = await parse_request(request)
+        text, user_id, user_name, response_url, team_id = await parse_request(request)
+        bind_log_context(user_id=user_id, team_id=team_id)
         if not text:
-            logger.error(f"No text found in form data for user {user_id}")
+            logger.error("No text found in form data for user %s", user_id)
             return get_error_layout("Missing text")
         if not user_id:
-            logger.error(f"No user_id found in form data for user {user_id}")
+            logger.error("No user_id found in form data for user %s", user_id)
             return get_error_layout("Missing user_id")
+        if not await allow_request(user_id, team_id):
+            logger.warning("Rate limited reword-fix request for user %s", user_id)
+            return get_error_layout(RATE_LIMITED_MESSAGE, text)
         
-        slack_service = SlackService()
-        # Send acknowledgment via response_url (Slack will already have received this)
-        payload = get_acknowledgment_payload(user_id, response_url)
-        await send_action_response(payload, "acknowledgment", slack_service, response_url)
-        logger.info(f"Sent acknowledgment for user {user_id} for reword-fix")
+        # The processing layout returned below is the acknowledgment
         
-        # Add background task to do the actual work
-        background_tasks.add_task(
-            process_rewordit_fix_task,
+        # Queue a job to do the actual work
+        await dispatch_job(
+            background_tasks,
+            "rewordit_fix",
             text=text,
             user_id=user_id,
             user_name=user_name,
-            response_url=response_url,
-            db_session=db
+            response_url=response_url
         )
         
         # Return an immediate response (within 3 seconds) to Slack
-        logger.info(f"Added reword-fix task to background for user {user_id}")
+        logger.info("Queued reword-fix job for user %s", user_id)
         return get_processing_layout()
         
     except Exception as e:
-        logger.error(f"Error processing reword-fix request for user {user_id}: {str(e)}", exc_info=True)
+        logger.error("Error processing reword-fix request for user %s: %s", user_id, e, exc_info=True)
         return get_error_layout("Error processing request")
 
-# Background task function for processing paraphrasing
+# Background job for processing paraphrasing
+@job_handler("paraphrase")
 async def process_paraphrase_task(
     text_to_rephrase: str,
     tone: str,
     user_id: str,
     user_name: str,
-    response_url: str,
-    db_session: Session
+    response_url: str
 ):
     try:
-        slack_service = SlackService()
-        db = db_session
-        db_service = DatabaseService(db)
-
-        user = db_service.get_or_create_user(user_id, user_name)
-        has_credits = check_user_credits(user)
-        if not has_credits:
-            payload = get_error_payload("You have no credits left", text_to_rephrase, response_url)
-            await send_action_response(payload, "error", slack_service, response_url)
-            return
-        
-        paraphrase_service = ParaphraseService()
-        paraphrased_text = await paraphrase_service.paraphrase(text_to_rephrase, tone)
-        
-        if not paraphrased_text:
-            logger.error(f"Failed to get rephrased text from service for user {user_id}")
-            payload = get_error_payload("Failed to get rephrased text", text_to_rephrase, response_url)
-            await send_action_response(payload, "error", slack_service, response_url)
-            return
-        
-        db_service.create_or_update_paraphrase(
-            user_id=user.id,
-            original_text=text_to_rephrase,
-            paraphrased_text=paraphrased_text,
-            tone=tone
-        )
-        
+        slack_service = get_slack_service()
+        job = current_job()
+        if job is not None and job.result is not None:
+            # An earlier attempt already charged for this result but did not get to post it
+            paraphrased_text = job.result
+        else:
+            async with async_session_scope() as db:
+                db_service = AsyncDatabaseService(db)
+                user = await db_service.get_or_create_user(user_id, user_name)
+                async with CreditLedger(db).hold(user, job_id=job.id if job else None) as hold:
+                    if not hold.reserved:
+                        payload = get_error_payload("You have no credits left", text_to_rephrase, response_url)
+                        await send_action_response(payload, "error", slack_service, response_url)
+                        return
+
+                    paraphrase_service = ParaphraseService(user_id)
+                    paraphrased_text = await get_model_text(
+                        lambda: paraphrase_service.stream_paraphrase(text_to_rephrase, tone),
+                        lambda: paraphrase_service.paraphrase(text_to_rephrase, tone),
+                        text_to_rephrase, slack_service, response_url
+                    )
+
+                    if not paraphrased_text:
+                        # Raised so a queued job is retried; the hold is released on the way out
+                        raise RuntimeError("Failed to get rephrased text")
+
+                    # Store the result and commit the credit hold in one transaction
+                    await db_service.record_paraphrase(
+                        hold=hold,
+                        original_text=text_to_rephrase,
+                        paraphrased_text=paraphrased_text,
+                        tone=tone,
+                        prompt_version=prompt_version("paraphrase"),
+                        job_id=job.id if job else None
+                    )
+
         # Send the result to Slack
         payload = get_rephrase_response_payload(text_to_rephrase, paraphrased_text, user_id)
-        await send_action_response(payload, "rephrased", slack_service, response_url)
-        logger.info(f"Successfully processed paraphrase for user {user_id}")
+        await send_action_response(payload, "rephrased", slack_service, response_url, replace_original=settings.openrouter_stream)
+        logger.info("Successfully processed paraphrase for user %s", user_id)
 
-        # Update user credits
-        db_service.update_user_credits(user.id)
-    
-    except Exception as e:
-        logger.error(f"Error in background paraphrase task: {str(e)}", exc_info=True)
+    except AdmissionRejected as e:
         payload = get_error_payload(str(e), text_to_rephrase, response_url)
         await send_action_response(payload, "error", slack_service, response_url)
+    except Exception as e:
+        logger.error("Error in background paraphrase task: %s", e, exc_info=True)
+        await report_task_failure(e, text_to_rephrase, slack_service, response_url)
 
-# Background task function for processing rewrite action
+# Background job for processing rewrite action
+@job_handler("rewrite_action")
 async def process_rewrite_action_task(
     original_text: str,
     user_id: str,
     user_name: str,
     response_url: str,
-    db_session: Session,
     tone: str | None = None
 ):
     try:
-        slack_service = SlackService()
-        db = db_session
-        db_service = DatabaseService(db)
-
-        user = db_service.get_or_create_user(user_id, user_name)
-        has_credits = check_user_credits(user)
-        if not has_credits:
-            payload = get_error_payload("You have no credits left", original_text, response_url)
-            await send_action_response(payload, "error", slack_service, response_url)
-            return
-        
-        paraphrase_service = ParaphraseService()
-        new_paraphrased_text = await paraphrase_service.paraphrase(original_text, tone)
-        
-        if not new_paraphrased_text:
-            logger.error(f"Failed to get paraphrased text for user {user_id}")
-            payload = get_error_payload("Failed to get paraphrased text", original_text, response_url)
-            await send_action_response(payload, "error", slack_service, response_url)
-            return
-        
-        db_service.create_or_update_paraphrase(
-            user_id=user.id,
-            original_text=original_text,
-            paraphrased_text=new_paraphrased_text,
-            tone=tone
-        )
-        
+        slack_service = get_slack_service()
+        job = current_job()
+        if job is not None and job.result is not None:
+            # An earlier attempt already charged for this result but did not get to post it
+            new_paraphrased_text = job.result
+        else:
+            async with async_session_scope() as db:
+                db_service = AsyncDatabaseService(db)
+                user = await db_service.get_or_create_user(user_id, user_name)
+                async with CreditLedger(db).hold(user, job_id=job.id if job else None) as hold:
+                    if not hold.reserved:
+                        payload = get_error_payload("You have no credits left", original_text, response_url)
+                        await send_action_response(payload, "error", slack_service, response_url)
+                        return
+
+                    paraphrase_service = ParaphraseService(user_id)
+                    # The user asked for a new variant, so skip the result cache
+                    new_paraphrased_text = await get_model_text(
+                        lambda: paraphrase_service.stream_paraphrase(original_text, tone, use_cache=False),
+                        lambda: paraphrase_service.paraphrase(original_text, tone, use_cache=False),
+                        original_text, slack_service, response_url
+                    )
+
+                    if not new_paraphrased_text:
+                        # Raised so a queued job is retried; the hold is released on the way out
+                        raise RuntimeError("Failed to get paraphrased text")
+
+                    # Store the result and commit the credit hold in one transaction
+                    await db_service.record_paraphrase(
+                        hold=hold,
+                        original_text=original_text,
+                        paraphrased_text=new_paraphrased_text,
+                        tone=tone,
+                        prompt_version=prompt_version("paraphrase"),
+                        job_id=job.id if job else None
+                    )
+
         # Send the result to Slack
         payload = get_rephrase_response_payload(original_text, new_paraphrased_text, user_id)
-        await send_action_response(payload, "rephrased", slack_service, response_url)
-        logger.info(f"Successfully processed rewrite action for user {user_id}")
+        await send_action_response(payload, "rephrased", slack_service, response_url, replace_original=settings.openrouter_stream)
+        logger.info("Successfully processed rewrite action for user %s", user_id)
 
-        # Update user credits
-        db_service.update_user_credits(user.id)
-    
-    except Exception as e:
-        logger.error(f"Error in background rewrite action task: {str(e)}", exc_info=True)
+    except AdmissionRejected as e:
         payload = get_error_payload(str(e), original_text, response_url)
         await send_action_response(payload, "error", slack_service, response_url)
+    except Exception as e:
+        logger.error("Error in background rewrite action task: %s", e, exc_info=True)
+        await report_task_failure(e, original_text, slack_service, response_url)
 
+@job_handler("rewordit_fix")
 async def process_rewordit_fix_task(
     text: str,
     user_id: str,
     user_name: str,
-    response_url: str,
-    db_session: Session
+    response_url: str
 ):
     try:
-        db = db_session
-        slack_service = SlackService()               
-        db_service = DatabaseService(db)
-        
-        user = db_service.get_or_create_user(user_id, user_name)
-        has_credits = check_user_credits(user)
-        if not has_credits:
-            payload = get_error_payload("You have no credits left", text, response_url)
-            await send_action_response(payload, "error", slack_service, response_url)
-            return
-        
-        paraphrase_service = ParaphraseService()
-        fixed_text = await paraphrase_service.fix_text(text)
-        
-        if not fixed_text:
-            logger.error(f"Failed to get fixed text for user {user_id}")
-            payload = get_error_payload("Failed to get fixed text", text, response_url)
-            await send_action_response(payload, "error", slack_service, response_url)
-            return
-        
-        db_service.create_or_update_paraphrase(
-            user_id=user.id,
-            original_text=text,
-            paraphrased_text=fixed_text,
-        )
+        slack_service = get_slack_service()
+        job = current_job()
+        if job is not None and job.result is not None:
+            # An earlier attempt already charged for this result but did not get to post it
+            fixed_text = job.result
+        else:
+            async with async_session_scope() as db:
+                db_service = AsyncDatabaseService(db)
+                user = await db_service.get_or_create_user(user_id, user_name)
+                async with CreditLedger(db).hold(user, job_id=job.id if job else None) as hold:
+                    if not hold.reserved:
+                        payload = get_error_payload("You have no credits left", text, response_url)
+                        await send_action_response(payload, "error", slack_service, response_url)
+                        return
+
+                    paraphrase_service = ParaphraseService(user_id)
+                    fixed_text = await get_model_text(
+                        lambda: paraphrase_service.stream_fix_text(text),
+                        lambda: paraphrase_service.fix_text(text),
+                        text, slack_service, response_url
+                    )
+
+                    if not fixed_text:
+                        # Raised so a queued job is retried; the hold is released on the way out
+                        raise RuntimeError("Failed to get fixed text")
+
+                    # Store the result and commit the credit hold in one transaction
+                    await db_service.record_paraphrase(
+                        hold=hold,
+                        original_text=text,
+                        paraphrased_text=fixed_text,
+                        prompt_version=prompt_version("fix"),
+                        job_id=job.id if job else None
+                    )
 
         # Send the result to Slack
         payload = get_rephrase_response_payload(text, fixed_text, user_id)
-        await send_action_response(payload, "rephrased", slack_service, response_url)
-        logger.info(f"Successfully processed rewordit fix for user {user_id}")
+        await send_action_response(payload, "rephrased", slack_service, response_url, replace_original=settings.openrouter_stream)
+        logger.info("Successfully processed rewordit fix for user %s", user_id)
 
-        # Update user credits
-        db_service.update_user_credits(user.id)
-        
-    except Exception as e:
-        logger.error(f"Error in background rewordit fix task: {str(e)}", exc_info=True)
-        # Send error to user
+    except AdmissionRejected as e:
         payload = get_error_payload(str(e), text, response_url)
-        await send_action_response(payload, "error", slack_service, response_url)    
+        await send_action_response(payload, "error", slack_service, response_url)
+    except Exception as e:
+        logger.error("Error in background rewordit fix task: %s", e, exc_info=True)
+        await report_task_failure(e, text, slack_service, response_url)
+
+async def get_model_text(
+    stream: Callable[[], AsyncIterator[str]],
+    complete: Callable[[], Awaitable[Optional[str]]],
+    original_text: str,
+    slack_service: SlackService,
+    response_url: str
+) -> Optional[str]:
+    """Stream partial text into the Slack message when streaming is enabled, otherwise wait for the full result.
+
+    Raises AdmissionRejected when the upstream model is saturated.
+    """
+    if not settings.openrouter_stream:
+        return await complete()
+    text = await slack_service.stream_action_response(
+        response_url,
+        stream(),
+        lambda partial_text: get_streaming_layout(original_text, partial_text)
+    )
+    return text or None
+
+async def acknowledge_then_dispatch(
+    background_tasks: BackgroundTasks,
+    acknowledgment: dict,
+    slack_service: SlackService,
+    kind: str,
+    original_text: str,
+    response_url: str,
+    **payload
+):
+    """Post the acknowledgment, then queue the job; runs as a background task after Slack has its response"""
+    try:
+        await send_action_response(acknowledgment, "acknowledgment", slack_service, response_url)
+    except Exception as e:
+        logger.warning("Failed to post acknowledgment for user %s: %s", payload.get("user_id"), e)
+    try:
+        await dispatch_job(background_tasks, kind, original_text=original_text, response_url=response_url, **payload)
+    except Exception as e:
+        logger.error("Failed to queue %s job for user %s: %s", kind, payload.get("user_id"), e, exc_info=True)
+        error = get_error_payload("Error processing request", original_text, response_url)
+        await send_action_response(error, "error", slack_service, response_url)
+
+async def report_task_failure(error: Exception, original_text: str, slack_service: SlackService, response_url: str):
+    """Show the error to the user unless the job queue will retry the task.
+
+    Inside a queued job the error is re-raised, so the worker retries the job
+    with backoff or dead-letters it after its last attempt.
+    """
+    job = current_job()
+    if job is None or is_final_attempt(job):
+        payload = get_error_payload(str(error), original_text, response_url)
+        await send_action_response(payload, "error", slack_service, response_url)
+    if job is not None:
+        raise error
 
-async def send_action_response(payload: dict, type: str, slack_service: SlackService, response_url: str):
+async def send_action_response(payload: dict, type: str, slack_service: SlackService, response_url: str, replace_original: bool = False):
     layout = get_action_response_layout(payload, type)
+    if replace_original:
+        layout = {**layout, "replace_original": True}
     await slack_service.send_action_response(response_url, layout)
 
 def get_action_response_layout(payload: dict, type: str):
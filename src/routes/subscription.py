@@ -7,8 +7,8 @@ Python 3.6 or newer required.
 """
 from fastapi import APIRouter, HTTPException, Request
 from src.database import SessionLocal
-from src.services.database import DatabaseService
-import stripe
+from src.services.database import DatabaseService, invalidate_cached_user
+from src.services.billing import get_stripe
 from src.config import settings
 import logging
 from src.models.subscription import (
@@ -22,9 +22,6 @@ from src.models.subscription import (
 
 router = APIRouter(prefix="/subscription", tags=["subscription"])
 
-# Initialize Stripe with the API key from config
-stripe.api_key = settings.stripe_secret_key
-
 """ @app.route('/', methods=['GET'])
 def get_index():
     return current_app.send_static_file('index.html') """
@@ -32,6 +29,7 @@ logger = logging.getLogger(__name__)
 
 @router.post("/create-checkout-session", response_model=SubscriptionResponse)
 async def create_checkout_session(request: SubscriptionRequest):
+    stripe = get_stripe()
     try:
         plan = request.plan
         price_details = SUBSCRIPTION_PRICES[plan]
@@ -73,6 +71,7 @@ async def create_checkout_session(request: SubscriptionRequest):
 
 @router.post("/create-portal-session", response_model=PortalSessionResponse)
 async def customer_portal(request: PortalSessionRequest):
+    stripe = get_stripe()
     try:
         checkout_session = stripe.checkout.Session.retrieve(request.session_id)
         
@@ -90,6 +89,7 @@ async def customer_portal(request: PortalSessionRequest):
 
 @router.post("/webhook")
 async def webhook_received(request: Request):
+    stripe = get_stripe()
     try:
         stripe_webhook_secret = settings.stripe_webhook_secret
         payload = await request.body()
@@ -113,13 +113,18 @@ async def webhook_received(request: Request):
             db = SessionLocal()
             database_service = DatabaseService(db)
             user = database_service.get_or_create_user(customer)
+            invalidate_cached_user(email=customer)
             # Here you can add logic to update user's subscription status in your database
         elif event_type == 'customer.subscription.created':
             logger.info(f"Subscription created: {data['id']}")
+            # Subscription events only carry the Stripe customer id, so drop every cached plan
+            invalidate_cached_user()
         elif event_type == 'customer.subscription.updated':
             logger.info(f"Subscription updated: {data['id']}")
+            invalidate_cached_user()
         elif event_type == 'customer.subscription.deleted':
             logger.info(f"Subscription canceled: {data['id']}")
+            invalidate_cached_user()
 
         return {"status": "success"}
     except Exception as e:
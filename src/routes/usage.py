@@ -0,0 +1,24 @@
+import logging
+from typing import Literal
+from fastapi import APIRouter, Header, HTTPException
+from src.services.usage import usage_stats
+from src.utils.auth import verify_admin_token
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/usage", tags=["usage"])
+
+@router.get("/stats")
+async def get_usage_stats(
+    group_by: Literal["user", "model"] = "model",
+    hours: float = 24,
+    limit: int = 100,
+    authorization: str | None = Header(default=None)
+):
+    """Token counts and upstream latency per Slack user or per model, most expensive first"""
+    verify_admin_token(authorization)
+    try:
+        return {"group_by": group_by, "hours": hours, "stats": await usage_stats(group_by, hours, limit)}
+    except Exception as e:
+        logger.error("Error fetching usage stats: %s", e, exc_info=True)
+        raise HTTPException(status_code=500, detail="Failed to fetch usage stats")
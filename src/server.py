@@ -0,0 +1,87 @@
+"""
+Production HTTP server: gunicorn supervising one uvicorn worker per CPU, each
+running the app on uvloop with the httptools parser.
+
+    python -m src.server --port 8443 --ssl-keyfile certs/key.pem --ssl-certfile certs/cert.pem
+
+On SIGTERM gunicorn stops accepting connections and every worker waits up to
+SERVER_GRACEFUL_TIMEOUT for in-flight requests and their background tasks
+before running the app's shutdown (flushing usage records, closing clients).
+"""
+import argparse
+import os
+import tempfile
+from gunicorn.app.base import BaseApplication
+from uvicorn.workers import UvicornWorker
+from src.config import get_settings, settings
+
+
+class TunedUvicornWorker(UvicornWorker):
+    CONFIG_KWARGS = {
+        "loop": "uvloop",
+        "http": "httptools",
+        "lifespan": "on",
+        "timeout_graceful_shutdown": settings.server_graceful_timeout,
+    }
+
+
+def cpu_count() -> int:
+    # Respect CPU affinity (e.g. container cpusets) where the platform reports it
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+class Server(BaseApplication):
+    def __init__(self, options: dict):
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            if value is not None:
+                self.cfg.set(key, value)
+
+    def load(self):
+        # Workers import the app themselves after the fork so no connections are shared
+        from src.main import app
+        return app
+
+
+def prepare_metrics_dir(workers: int):
+    """Give the workers a shared directory for metrics snapshots so /metrics covers all of them"""
+    if workers < 2:
+        return
+    if not settings.metrics_dir:
+        # Workers are forked from this process and inherit its settings object
+        get_settings().metrics_dir = tempfile.mkdtemp(prefix="rewordit-metrics-")
+    # Snapshots left by processes that are gone are removed when /metrics reads them
+    os.makedirs(settings.metrics_dir, exist_ok=True)
+
+
+def server_options(args) -> dict:
+    workers = args.workers or settings.server_workers or cpu_count()
+    prepare_metrics_dir(workers)
+    return {
+        "bind": f"{args.host}:{args.port}",
+        "workers": workers,
+        "worker_class": f"{TunedUvicornWorker.__module__}.{TunedUvicornWorker.__name__}",
+        "keepalive": settings.server_keepalive,
+        "backlog": settings.server_backlog,
+        "timeout": settings.server_timeout,
+        "graceful_timeout": settings.server_graceful_timeout,
+        "keyfile": args.ssl_keyfile,
+        "certfile": args.ssl_certfile,
+        "accesslog": None,
+        "errorlog": "-",
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=settings.server_host)
+    parser.add_argument("--port", type=int, default=settings.server_port)
+    parser.add_argument("--workers", type=int, default=None, help="Defaults to SERVER_WORKERS, or one per CPU")
+    parser.add_argument("--ssl-keyfile", default=None)
+    parser.add_argument("--ssl-certfile", default=None)
+    Server(server_options(parser.parse_args())).run()
@@ -0,0 +1,139 @@
+import asyncio
+import logging
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+from src.config import settings
+from src.utils.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+ADMISSION_REJECTED = REGISTRY.counter("admission_rejected_total", "Model calls turned away by admission control", ["reason"])
+ADMISSION_WAIT = REGISTRY.histogram("admission_wait_seconds", "Time a model call waited for a slot")
+ADMISSION_SLOTS = REGISTRY.gauge("admission_slots", "Model call slots by state", ["state"])
+
+BUSY_MESSAGE = "RewordIt is very busy right now, please try again in a moment"
+USER_BUSY_MESSAGE = "You already have several requests in progress, please wait for them to finish"
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, reason: str, message: str):
+        super().__init__(message)
+        self.reason = reason
+
+
+class AdmissionController:
+    """Bound concurrent upstream model calls.
+
+    Up to max_in_flight calls run at once and up to max_queue more wait.
+    Waiters are woken round-robin across users, and no user may have more
+    than max_per_user calls running or waiting, so one user cannot take
+    every slot. Anything beyond that is rejected immediately.
+    """
+
+    def __init__(self, max_in_flight: int, max_queue: int, max_per_user: int, queue_timeout: float):
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.max_per_user = max_per_user
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self.queued = 0
+        self._per_user: dict[str, int] = {}
+        self._waiters: OrderedDict[str, deque[asyncio.Future]] = OrderedDict()
+
+    @asynccontextmanager
+    async def slot(self, user_id: str) -> AsyncIterator[None]:
+        await self.acquire(user_id)
+        try:
+            yield
+        finally:
+            self.release(user_id)
+
+    async def acquire(self, user_id: str):
+        if self._per_user.get(user_id, 0) >= self.max_per_user:
+            self.reject("user_limit", USER_BUSY_MESSAGE)
+        if self.in_flight < self.max_in_flight and not self.queued:
+            self.in_flight += 1
+            self._per_user[user_id] = self._per_user.get(user_id, 0) + 1
+            ADMISSION_WAIT.observe(0.0)
+            return
+        if self.queued >= self.max_queue:
+            self.reject("queue_full", BUSY_MESSAGE)
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(user_id, deque()).append(future)
+        self._per_user[user_id] = self._per_user.get(user_id, 0) + 1
+        self.queued += 1
+        try:
+            with ADMISSION_WAIT.time():
+                await asyncio.wait_for(asyncio.shield(future), timeout=self.queue_timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if future.done() and not future.cancelled():
+                # The slot was granted just as we gave up; hand it back
+                self.release(user_id)
+            else:
+                future.cancel()
+                self._drop_waiter(user_id, future)
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            self.reject("queue_timeout", BUSY_MESSAGE)
+
+    def release(self, user_id: str):
+        self.in_flight -= 1
+        self._decrement_user(user_id)
+        self._wake()
+
+    def _wake(self):
+        while self.in_flight < self.max_in_flight and self._waiters:
+            user_id, waiters = next(iter(self._waiters.items()))
+            future = waiters.popleft()
+            if waiters:
+                # Round-robin: this user goes to the back of the line
+                self._waiters.move_to_end(user_id)
+            else:
+                del self._waiters[user_id]
+            self.queued -= 1
+            if future.done():
+                continue
+            self.in_flight += 1
+            future.set_result(None)
+
+    def _drop_waiter(self, user_id: str, future: asyncio.Future):
+        waiters = self._waiters.get(user_id)
+        if waiters is None or future not in waiters:
+            return
+        waiters.remove(future)
+        if not waiters:
+            del self._waiters[user_id]
+        self.queued -= 1
+        self._decrement_user(user_id)
+
+    def _decrement_user(self, user_id: str):
+        remaining = self._per_user.get(user_id, 0) - 1
+        if remaining > 0:
+            self._per_user[user_id] = remaining
+        else:
+            self._per_user.pop(user_id, None)
+
+    def reject(self, reason: str, message: str):
+        ADMISSION_REJECTED.inc(reason=reason)
+        logger.warning("Admission rejected (%s): %s in flight, %s queued", reason, self.in_flight, self.queued)
+        raise AdmissionRejected(reason, message)
+
+
+_admission_controller: Optional[AdmissionController] = None
+
+
+def get_admission_controller() -> AdmissionController:
+    """Return the process-wide admission controller for upstream model calls"""
+    global _admission_controller
+    if _admission_controller is None:
+        _admission_controller = AdmissionController(
+            max_in_flight=settings.admission_max_in_flight,
+            max_queue=settings.admission_max_queue,
+            max_per_user=settings.admission_max_per_user,
+            queue_timeout=settings.admission_queue_timeout,
+        )
+        ADMISSION_SLOTS.set_function(lambda: _admission_controller.in_flight, state="in_flight")
+        ADMISSION_SLOTS.set_function(lambda: _admission_controller.queued, state="queued")
+    return _admission_controller
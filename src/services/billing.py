@@ -0,0 +1,15 @@
+from types import ModuleType
+from typing import Optional
+from src.config import settings
+
+_stripe: Optional[ModuleType] = None
+
+
+def get_stripe() -> ModuleType:
+    """Import and configure the Stripe SDK on first use; it is slow to import and only billing routes need it"""
+    global _stripe
+    if _stripe is None:
+        import stripe
+        stripe.api_key = settings.stripe_secret_key
+        _stripe = stripe
+    return _stripe
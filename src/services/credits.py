@@ -0,0 +1,157 @@
+import asyncio
+import logging
+from collections import Counter
+from contextlib import asynccontextmanager
+from datetime import timedelta
+from typing import AsyncIterator, Optional
+from sqlalchemy import delete, func, insert, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.config import settings
+from src.models.database import CreditReservation, User, utcnow
+
+logger = logging.getLogger(__name__)
+
+# A hold's block is cancelled at its timeout; past this much longer its holder is gone
+RESERVATION_GRACE = 60.0
+
+
+class CreditHold:
+    def __init__(self, user, reservation_id=None, amount: int = 1):
+        self.user = user
+        self.reservation_id = reservation_id
+        self.reserved = reservation_id is not None
+        self.amount = amount
+        self.settled = not self.reserved
+
+    @property
+    def user_id(self):
+        return self.user.id
+
+
+def commit_reserved_credit(user_id, used: int = 1, reserved: Optional[int] = None):
+    """UPDATE turning reserved credits into used ones, returning the new credits_used.
+
+    reserved defaults to used; pass a larger value to hand back the part of a hold that was not spent.
+    """
+    reserved = used if reserved is None else reserved
+    return (
+        update(User)
+        .where(User.id == user_id)
+        .values(credits_used=User.credits_used + used, credits_reserved=User.credits_reserved - reserved)
+        .returning(User.credits_used)
+    )
+
+
+def delete_reservation(reservation_id):
+    """DELETE of a reservation row returning its amount; nothing is returned once it has been reclaimed"""
+    return delete(CreditReservation).where(CreditReservation.id == reservation_id).returning(CreditReservation.amount)
+
+
+class CreditLedger:
+    """Reserve a credit before calling the model, then commit or release it.
+
+    A reservation is a single conditional UPDATE, so concurrent requests
+    from one user can never hold more credits than they have left. Each one
+    is also recorded in credit_reservations, with its job and an expiry, so
+    reclaim() can hand back the holds of a worker that died holding them.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def reserve(self, user_id, amount: int = 1, timeout: Optional[float] = None, job_id=None):
+        """Reserve amount credits, returning the reservation id, or None when the user has too few left"""
+        result = await self.db.execute(
+            update(User)
+            .where(
+                User.id == user_id,
+                User.credits_used + User.credits_reserved + amount <= User.credits_assigned
+            )
+            .values(credits_reserved=User.credits_reserved + amount)
+            .returning(User.id)
+        )
+        reservation_id = None
+        if result.first() is not None:
+            expires_at = utcnow() + timedelta(seconds=(timeout or settings.credit_hold_timeout) + RESERVATION_GRACE)
+            result = await self.db.execute(
+                insert(CreditReservation)
+                .values(user_id=user_id, amount=amount, job_id=job_id, expires_at=expires_at)
+                .returning(CreditReservation.id)
+            )
+            reservation_id = result.scalar_one()
+        await self.db.commit()
+        return reservation_id
+
+    async def commit(self, hold: CreditHold, used: Optional[int] = None) -> int:
+        """Charge used credits of the hold (all of them by default) and release the rest"""
+        used = hold.amount if used is None else used
+        # A reclaimed hold was already handed back, so there is nothing reserved left to release
+        reserved = (await self.db.execute(delete_reservation(hold.reservation_id))).scalar_one_or_none() or 0
+        result = await self.db.execute(commit_reserved_credit(hold.user_id, used, reserved))
+        credits_used = result.scalar_one()
+        await self.db.commit()
+        hold.settled = True
+        hold.user.credits_used = credits_used
+        return credits_used
+
+    async def release(self, hold: CreditHold):
+        reserved = (await self.db.execute(delete_reservation(hold.reservation_id))).scalar_one_or_none()
+        if reserved is not None:
+            await self.db.execute(
+                update(User)
+                .where(User.id == hold.user_id)
+                .values(credits_reserved=func.greatest(User.credits_reserved - reserved, 0))
+            )
+        await self.db.commit()
+        hold.settled = True
+
+    async def reclaim(self, job_id=None) -> int:
+        """Hand back the reservations of job_id, or all expired ones, in the caller's transaction.
+
+        Returns the number of credits handed back; the caller commits.
+        """
+        if job_id is not None:
+            condition = CreditReservation.job_id == job_id
+        else:
+            condition = CreditReservation.expires_at < utcnow()
+        result = await self.db.execute(
+            delete(CreditReservation).where(condition).returning(CreditReservation.user_id, CreditReservation.amount)
+        )
+        reclaimed = Counter()
+        for user_id, amount in result.all():
+            reclaimed[user_id] += amount
+        for user_id, amount in reclaimed.items():
+            await self.db.execute(
+                update(User)
+                .where(User.id == user_id)
+                .values(credits_reserved=func.greatest(User.credits_reserved - amount, 0))
+            )
+        return sum(reclaimed.values())
+
+    @asynccontextmanager
+    async def hold(self, user, amount: int = 1, timeout: Optional[float] = None, job_id=None) -> AsyncIterator[CreditHold]:
+        """Hold amount credits for the block; they are released unless committed before the block exits.
+
+        Only the conditional UPDATE decides: user may be a cached snapshot
+        from before a top-up in another process. The block is cancelled with
+        TimeoutError after timeout, settings.credit_hold_timeout by default.
+        Pass the queued job's id as job_id so a redelivery of the job
+        reclaims the hold if this worker dies.
+        """
+        timeout = timeout or settings.credit_hold_timeout
+        hold = CreditHold(user, await self.reserve(user.id, amount, timeout, job_id), amount)
+        if not hold.reserved:
+            # The cached snapshot was behind, or another request holds the last credit;
+            # refetch the balance next time rather than refusing until the entry expires
+            from src.services.database import invalidate_cached_user
+            invalidate_cached_user(user_id=user.id)
+        try:
+            async with asyncio.timeout(timeout):
+                yield hold
+        finally:
+            if not hold.settled:
+                try:
+                    await self.db.rollback()
+                    await self.release(hold)
+                except Exception as e:
+                    logger.error("Failed to release credit hold for user %s: %s", hold.user_id, e)
@@ -1,8 +1,49 @@
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from src.models.database import User, Paraphrase
+from src.services.credits import CreditHold, commit_reserved_credit, delete_reservation
+from src.services.jobs import store_job_result
+from src.utils.cache import TTLCache
 from src.utils.constants import FREE_CREDITS
+from src.config import settings
 from typing import Optional, Dict, Any
 
+class CachedUser:
+    """Detached snapshot of a users row, safe to share between sessions"""
+
+    def __init__(self, user: User):
+        self.id = user.id
+        self.slack_user_id = user.slack_user_id
+        self.user_name = user.user_name
+        self.email = user.email
+        self.plan = user.plan
+        self.credits_assigned = user.credits_assigned
+        self.credits_used = user.credits_used
+        self.credits_reserved = user.credits_reserved
+
+_user_cache: Optional[TTLCache] = None
+
+def get_user_cache() -> TTLCache:
+    global _user_cache
+    if _user_cache is None:
+        _user_cache = TTLCache("users", maxsize=settings.user_cache_size, ttl=settings.user_cache_ttl)
+    return _user_cache
+
+def invalidate_cached_user(user_id=None, email: Optional[str] = None) -> int:
+    """Drop cached users matching the id or email; with neither, drop them all"""
+    if user_id is None and email is None:
+        dropped = len(get_user_cache())
+        get_user_cache().clear()
+        return dropped
+    return get_user_cache().discard_where(
+        lambda user: (user_id is not None and user.id == user_id) or (email is not None and user.email == email)
+    )
+
+def cache_user(user: CachedUser):
+    get_user_cache().set(user.slack_user_id, user)
+
 class DatabaseService:
     def __init__(self, db: Session):
         self.db = db
@@ -29,6 +70,7 @@ class DatabaseService:
         user.user_info = user_info
         self.db.commit()
         self.db.refresh(user)
+        invalidate_cached_user(user_id)
         return user
 
     def update_user_credits(self, user_id: int):
@@ -36,6 +78,7 @@ class DatabaseService:
         user.credits_used += 1
         self.db.commit()
         self.db.refresh(user)
+        invalidate_cached_user(user_id)
 
     def create_or_update_paraphrase(
         self,
@@ -85,4 +128,150 @@ class DatabaseService:
             Paraphrase.user_id == user.id,
             ~Paraphrase.id.in_(self.db.query(keep_ids))
         ).delete(synchronize_session=False)
-        self.db.commit()
\ No newline at end of file
+        self.db.commit()
+
+class AsyncDatabaseService:
+    """Async counterpart of DatabaseService for use inside coroutines and background tasks"""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def get_or_create_user(self, slack_user_id: str, user_name: Optional[str] = None) -> CachedUser:
+        """Return the cached user, or upsert it by slack_user_id in a single INSERT ... ON CONFLICT ... RETURNING"""
+        cached = get_user_cache().get(slack_user_id)
+        if cached is not None and (not user_name or cached.user_name == user_name):
+            return cached
+        stmt = insert(User).values(slack_user_id=slack_user_id, user_name=user_name)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[User.slack_user_id],
+            set_={"user_name": func.coalesce(stmt.excluded.user_name, User.user_name)}
+        ).returning(User)
+        result = await self.db.execute(stmt, execution_options={"populate_existing": True})
+        user = CachedUser(result.scalars().one())
+        await self.db.commit()
+        cache_user(user)
+        return user
+
+    async def update_user(self, user_id: int, user_info: Dict[str, Any]):
+        result = await self.db.execute(select(User).filter(User.id == user_id))
+        user = result.scalars().first()
+        user.user_info = user_info
+        await self.db.commit()
+        await self.db.refresh(user)
+        invalidate_cached_user(user_id)
+        return user
+
+    async def update_user_credits(self, user_id: int):
+        await self.db.execute(
+            update(User).where(User.id == user_id).values(credits_used=User.credits_used + 1)
+        )
+        await self.db.commit()
+        invalidate_cached_user(user_id)
+
+    async def create_or_update_paraphrase(
+        self,
+        user_id: int,
+        original_text: str,
+        paraphrased_text: str,
+        tone: Optional[str] = None
+    ) -> Paraphrase:
+        result = await self.db.execute(
+            select(Paraphrase).filter(Paraphrase.user_id == user_id).order_by(Paraphrase.created_at.desc()).limit(1)
+        )
+        paraphrase = result.scalars().first()
+        if not paraphrase:
+            paraphrase = Paraphrase(
+                user_id=user_id,
+                original_text=original_text,
+                paraphrased_text=paraphrased_text,
+                tone=tone
+            )
+            self.db.add(paraphrase)
+        else:
+            paraphrase.original_text = original_text
+            paraphrase.paraphrased_text = paraphrased_text
+            paraphrase.tone = tone
+        await self.db.commit()
+        await self.db.refresh(paraphrase)
+        return paraphrase
+
+    async def record_paraphrase(
+        self,
+        hold: CreditHold,
+        original_text: str,
+        paraphrased_text: str,
+        tone: Optional[str] = None,
+        prompt_version: Optional[str] = None,
+        job_id=None
+    ) -> int:
+        """Store the user's latest paraphrase and commit their credit hold in a single transaction.
+
+        With job_id, the result is also stored on the job, so a redelivered job
+        posts it again instead of charging for a new one.
+        Returns the user's credits_used after the charge.
+        """
+        user_id = hold.user_id
+        latest_id = (
+            select(Paraphrase.id)
+            .filter(Paraphrase.user_id == user_id)
+            .order_by(Paraphrase.created_at.desc())
+            .limit(1)
+            .scalar_subquery()
+        )
+        result = await self.db.execute(
+            update(Paraphrase)
+            .where(Paraphrase.id == latest_id)
+            .values(
+                original_text=original_text,
+                paraphrased_text=paraphrased_text,
+                tone=tone,
+                prompt_version=prompt_version
+            )
+            .returning(Paraphrase.id)
+        )
+        if result.first() is None:
+            await self.db.execute(
+                insert(Paraphrase).values(
+                    user_id=user_id,
+                    original_text=original_text,
+                    paraphrased_text=paraphrased_text,
+                    tone=tone,
+                    prompt_version=prompt_version
+                )
+            )
+        if job_id is not None:
+            await self.db.execute(store_job_result(job_id, paraphrased_text))
+        # A reclaimed hold was already handed back, so there is nothing reserved left to release
+        reserved = (await self.db.execute(delete_reservation(hold.reservation_id))).scalar_one_or_none() or 0
+        result = await self.db.execute(commit_reserved_credit(user_id, hold.amount, reserved))
+        credits_used = result.scalar_one()
+        await self.db.commit()
+        hold.settled = True
+        hold.user.credits_used = credits_used
+        cache_user(hold.user)
+        return credits_used
+
+    async def get_user_paraphrases(self, user_id: int, limit: int = 10) -> list[Paraphrase]:
+        result = await self.db.execute(
+            select(Paraphrase)
+            .filter(Paraphrase.user_id == user_id)
+            .order_by(Paraphrase.created_at.desc())
+            .limit(limit)
+        )
+        return list(result.scalars().all())
+
+    async def delete_user_paraphrases(self, user_id: int):
+        keep_ids = (
+            select(Paraphrase.id)
+            .filter(Paraphrase.user_id == user_id)
+            .order_by(Paraphrase.created_at.desc())
+            .limit(10)
+            .scalar_subquery()
+        )
+        await self.db.execute(
+            delete(Paraphrase).where(
+                Paraphrase.user_id == user_id,
+                ~Paraphrase.id.in_(keep_ids)
+            )
+        )
+        await self.db.commit()
@@ -0,0 +1,72 @@
+import httpx
+import logging
+from typing import Optional
+from src.config import settings
+
+logger = logging.getLogger(__name__)
+
+_openrouter_client: Optional[httpx.AsyncClient] = None
+_slack_client: Optional[httpx.AsyncClient] = None
+
+
+def _build_openrouter_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        http2=settings.openrouter_http2,
+        limits=httpx.Limits(
+            max_connections=settings.openrouter_max_connections,
+            max_keepalive_connections=settings.openrouter_max_keepalive_connections,
+            keepalive_expiry=settings.openrouter_keepalive_expiry,
+        ),
+        timeout=httpx.Timeout(
+            settings.openrouter_timeout,
+            connect=settings.openrouter_connect_timeout,
+        ),
+    )
+
+
+def get_openrouter_client() -> httpx.AsyncClient:
+    """Return the process-wide OpenRouter client, creating it on first use"""
+    global _openrouter_client
+    if _openrouter_client is None or _openrouter_client.is_closed:
+        _openrouter_client = _build_openrouter_client()
+    return _openrouter_client
+
+
+def _build_slack_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        http2=settings.slack_http2,
+        limits=httpx.Limits(
+            max_connections=settings.slack_max_connections,
+            max_keepalive_connections=settings.slack_max_keepalive_connections,
+            keepalive_expiry=settings.slack_keepalive_expiry,
+        ),
+        timeout=httpx.Timeout(
+            settings.slack_timeout,
+            connect=settings.slack_connect_timeout,
+        ),
+    )
+
+
+def get_slack_client() -> httpx.AsyncClient:
+    """Return the process-wide client used for Slack response_url posts"""
+    global _slack_client
+    if _slack_client is None or _slack_client.is_closed:
+        _slack_client = _build_slack_client()
+    return _slack_client
+
+
+async def open_http_clients():
+    get_openrouter_client()
+    get_slack_client()
+    logger.info("Opened shared HTTP clients")
+
+
+async def close_http_clients():
+    global _openrouter_client, _slack_client
+    if _openrouter_client is not None:
+        await _openrouter_client.aclose()
+        _openrouter_client = None
+    if _slack_client is not None:
+        await _slack_client.aclose()
+        _slack_client = None
+    logger.info("Closed shared HTTP clients")
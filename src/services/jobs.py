@@ -0,0 +1,136 @@
+import contextvars
+import logging
+from contextlib import contextmanager
+from datetime import timedelta
+from typing import Any, Awaitable, Callable, Iterator, Optional
+from fastapi import BackgroundTasks
+from sqlalchemy import and_, delete, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.config import settings
+from src.database import async_session_scope
+from src.services.credits import CreditLedger
+from src.models.database import Job, utcnow
+from src.utils.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+JOBS_ENQUEUED = REGISTRY.counter("jobs_enqueued_total", "Jobs written to the queue", ["kind"])
+JOBS_FINISHED = REGISTRY.counter("jobs_finished_total", "Job attempts by outcome", ["kind", "outcome"])
+
+_job_handlers: dict[str, Callable[..., Awaitable[Any]]] = {}
+_current_job: contextvars.ContextVar[Optional[Job]] = contextvars.ContextVar("current_job", default=None)
+
+
+def job_handler(kind: str):
+    """Register a coroutine function as the handler for jobs of this kind; the payload is passed as keyword arguments"""
+    def register(function):
+        _job_handlers[kind] = function
+        return function
+    return register
+
+
+def get_job_handler(kind: str) -> Optional[Callable[..., Awaitable[Any]]]:
+    return _job_handlers.get(kind)
+
+
+@contextmanager
+def running_job(job: Job) -> Iterator[Job]:
+    """Make job the current job of the handler running inside the block"""
+    token = _current_job.set(job)
+    try:
+        yield job
+    finally:
+        _current_job.reset(token)
+
+
+def current_job() -> Optional[Job]:
+    """The queued job being handled, or None when the handler runs in-process"""
+    return _current_job.get()
+
+
+def is_final_attempt(job: Job) -> bool:
+    return job.attempts >= job.max_attempts
+
+
+def store_job_result(job_id, result: str):
+    """UPDATE recording a job's result; run it in the transaction that charges for the result"""
+    return update(Job).where(Job.id == job_id).values(result=result)
+
+
+class JobQueue:
+    """Postgres-backed job queue; consumers claim jobs with SELECT ... FOR UPDATE SKIP LOCKED"""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+        self.visibility_timeout = timedelta(seconds=settings.job_visibility_timeout)
+        self.retry_base_delay = settings.job_retry_base_delay
+
+    async def enqueue(self, kind: str, payload: dict, max_attempts: Optional[int] = None) -> Job:
+        job = Job(kind=kind, payload=payload, max_attempts=max_attempts or settings.job_max_attempts)
+        self.db.add(job)
+        await self.db.commit()
+        JOBS_ENQUEUED.inc(kind=kind)
+        return job
+
+    async def claim(self) -> Optional[Job]:
+        """Lock the next due job, including running jobs whose visibility timeout expired"""
+        now = utcnow()
+        result = await self.db.execute(
+            select(Job)
+            .where(or_(
+                and_(Job.status == "queued", Job.run_at <= now),
+                and_(Job.status == "running", Job.locked_until < now)
+            ))
+            .order_by(Job.run_at)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+        )
+        job = result.scalars().first()
+        if job is None:
+            await self.db.rollback()
+            return None
+        if job.status == "running":
+            # The last attempt never reported back, most likely because its worker died holding credits
+            await CreditLedger(self.db).reclaim(job_id=job.id)
+        if job.status == "running" and is_final_attempt(job):
+            self.dead_letter(job, "Visibility timeout expired on the final attempt")
+            await self.db.commit()
+            return None
+        job.status = "running"
+        job.attempts += 1
+        job.locked_until = now + self.visibility_timeout
+        await self.db.commit()
+        return job
+
+    async def complete(self, job: Job):
+        await self.db.execute(delete(Job).where(Job.id == job.id))
+        await self.db.commit()
+        JOBS_FINISHED.inc(kind=job.kind, outcome="done")
+
+    async def fail(self, job: Job, error: str):
+        """Put the job back with exponential backoff, or dead-letter it once out of attempts"""
+        if is_final_attempt(job):
+            self.dead_letter(job, error)
+        else:
+            job.status = "queued"
+            job.locked_until = None
+            job.last_error = error
+            job.run_at = utcnow() + timedelta(seconds=self.retry_base_delay * 2 ** (job.attempts - 1))
+            JOBS_FINISHED.inc(kind=job.kind, outcome="retry")
+        await self.db.commit()
+
+    def dead_letter(self, job: Job, error: str):
+        logger.error("Job %s (%s) dead-lettered after %s attempts: %s", job.id, job.kind, job.attempts, error)
+        job.status = "dead"
+        job.locked_until = None
+        job.last_error = error
+        JOBS_FINISHED.inc(kind=job.kind, outcome="dead")
+
+
+async def dispatch_job(background_tasks: BackgroundTasks, kind: str, **payload):
+    """Queue a job for the workers, or run it in-process when the job queue is disabled"""
+    if not settings.job_queue_enabled:
+        background_tasks.add_task(_job_handlers[kind], **payload)
+        return
+    async with async_session_scope() as db:
+        await JobQueue(db).enqueue(kind, payload)
@@ -0,0 +1,116 @@
+import asyncio
+import logging
+import os
+from typing import Optional
+from sqlalchemy import func, select
+from src.config import settings
+from src.database import async_session_scope
+from src.models.database import Job
+from src.utils.circuit_breaker import STATE_VALUES
+from src.utils.metrics import merge_snapshots, read_snapshots, registry_snapshot, remove_snapshot, render_metrics, write_snapshot
+
+logger = logging.getLogger(__name__)
+
+_export_task: Optional[asyncio.Task] = None
+
+
+async def export_snapshots(directory: str):
+    while True:
+        await asyncio.sleep(settings.metrics_export_interval)
+        try:
+            await asyncio.to_thread(write_snapshot, directory)
+        except OSError as e:
+            logger.warning("Failed to write metrics snapshot: %s", e)
+
+
+def start_metrics_export():
+    """With several worker processes, periodically publish this process's metrics for the others to merge"""
+    global _export_task
+    if settings.metrics_dir and _export_task is None:
+        os.makedirs(settings.metrics_dir, exist_ok=True)
+        _export_task = asyncio.create_task(export_snapshots(settings.metrics_dir))
+
+
+async def stop_metrics_export():
+    global _export_task
+    if _export_task is None:
+        return
+    _export_task.cancel()
+    _export_task = None
+    # Nobody else would remove it, and its counts would be merged forever
+    try:
+        remove_snapshot(settings.metrics_dir)
+    except OSError as e:
+        logger.warning("Failed to remove metrics snapshot: %s", e)
+
+
+async def job_queue_family() -> Optional[dict]:
+    """Depth of the Postgres job queue; read from the database, so it is the same from every worker"""
+    if not settings.job_queue_enabled:
+        return None
+    try:
+        async with async_session_scope() as db:
+            rows = (await db.execute(select(Job.status, func.count()).group_by(Job.status))).all()
+    except Exception as e:
+        logger.warning("Failed to read job queue depth: %s", e)
+        return None
+    return {
+        "name": "jobs",
+        "type": "gauge",
+        "help": "Jobs in the Postgres queue by status",
+        "samples": [["jobs", {"status": status}, count] for status, count in rows],
+    }
+
+
+def cache_hit_ratio_family(families: list[dict]) -> Optional[dict]:
+    """Hit ratio per cache, derived from the merged counters so it is correct across workers"""
+    totals: dict[str, list[float]] = {}
+    for family in families:
+        if family["name"] in ("cache_hits_total", "cache_misses_total"):
+            index = 0 if family["name"] == "cache_hits_total" else 1
+            for _, labels, value in family["samples"]:
+                totals.setdefault(labels["cache"], [0.0, 0.0])[index] += value
+    if not totals:
+        return None
+    return {
+        "name": "cache_hit_ratio",
+        "type": "gauge",
+        "help": "Share of cache lookups that found a live entry",
+        "samples": [
+            ["cache_hit_ratio", {"cache": cache}, hits / (hits + misses) if hits + misses else 0.0]
+            for cache, (hits, misses) in totals.items()
+        ],
+    }
+
+
+async def merged_families() -> list[dict]:
+    """Metric families of this process merged with the latest snapshots of the other workers"""
+    snapshots = [registry_snapshot()]
+    if settings.metrics_dir and os.path.isdir(settings.metrics_dir):
+        # Snapshots older than a few export intervals are from a process that is gone
+        max_age = settings.metrics_export_interval * 3
+        snapshots += await asyncio.to_thread(read_snapshots, settings.metrics_dir, max_age)
+    return merge_snapshots(snapshots)
+
+
+async def all_circuit_states() -> dict[str, str]:
+    """Circuit breaker state per upstream across every process publishing snapshots, the worst state winning.
+
+    The OpenRouter breaker lives in the job worker, which calls the models.
+    """
+    names = {value: state for state, value in STATE_VALUES.items()}
+    states = {}
+    for family in await merged_families():
+        if family["name"] == "circuit_state":
+            for _, labels, value in family["samples"]:
+                states[labels["name"]] = names[int(value)]
+    return states
+
+
+async def collect_metrics() -> str:
+    """Metrics of this process merged with the latest snapshots of the other workers"""
+    families = await merged_families()
+    for family in (cache_hit_ratio_family(families), await job_queue_family()):
+        if family is not None:
+            families.append(family)
+    return render_metrics(families)
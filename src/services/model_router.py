@@ -0,0 +1,152 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Awaitable, Callable, Optional
+from src.config import settings
+from src.utils.circuit_breaker import CircuitOpenError
+from src.utils.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+TIMEOUT_GRACE = 1.0
+
+MODEL_REQUESTS = REGISTRY.counter("model_requests_total", "Upstream model attempts by outcome", ["model", "outcome"])
+MODEL_HEDGES = REGISTRY.counter("model_hedges_total", "Hedged requests fired because the first model exceeded its p95", ["model"])
+MODEL_P95 = REGISTRY.gauge("model_latency_p95_seconds", "Rolling p95 latency of successful calls per model", ["model"])
+MODEL_ERROR_RATE = REGISTRY.gauge("model_error_rate", "Rolling error rate per model", ["model"])
+
+
+class ModelStats:
+    """Rolling window of recent outcomes for one model"""
+
+    def __init__(self, window: int):
+        self.latencies: deque[float] = deque(maxlen=window)
+        self.outcomes: deque[bool] = deque(maxlen=window)
+
+    def record(self, ok: bool, latency: Optional[float] = None):
+        self.outcomes.append(ok)
+        if ok and latency is not None:
+            self.latencies.append(latency)
+
+    def p95(self) -> Optional[float]:
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))]
+
+    def error_rate(self) -> float:
+        if not self.outcomes:
+            return 0.0
+        return self.outcomes.count(False) / len(self.outcomes)
+
+
+class ModelRouter:
+    """Route each call to the fastest healthy model, falling back down the list and hedging slow calls"""
+
+    def __init__(self, models: list[str]):
+        self.models = models
+        self.stats = {model: ModelStats(settings.router_stats_window) for model in models}
+        self.min_samples = settings.router_stats_min_samples
+        self.max_error_rate = settings.router_max_error_rate
+        self.hedge = settings.openrouter_hedge
+        self.hedge_min_delay = settings.openrouter_hedge_min_delay
+        for model in models:
+            MODEL_P95.set_function(lambda model=model: self.stats[model].p95() or 0.0, model=model)
+            MODEL_ERROR_RATE.set_function(lambda model=model: self.stats[model].error_rate(), model=model)
+
+    def timeout_for(self, model: str) -> float:
+        return settings.openrouter_model_timeouts.get(model, settings.openrouter_timeout)
+
+    def is_healthy(self, model: str) -> bool:
+        stats = self.stats[model]
+        return len(stats.outcomes) < self.min_samples or stats.error_rate() <= self.max_error_rate
+
+    def ranked(self) -> list[str]:
+        """Healthy models first, then by p95; models without enough samples go after measured ones, in configured order.
+
+        Hedges and fallbacks give the lower-ranked models their samples.
+        """
+        def rank(item):
+            index, model = item
+            stats = self.stats[model]
+            p95 = stats.p95() if len(stats.latencies) >= self.min_samples else float("inf")
+            return (not self.is_healthy(model), p95, index)
+        return [model for _, model in sorted(enumerate(self.models), key=rank)]
+
+    def hedge_delay(self, model: str) -> Optional[float]:
+        stats = self.stats[model]
+        if not self.hedge or len(stats.latencies) < self.min_samples:
+            return None
+        return max(self.hedge_min_delay, stats.p95())
+
+    async def attempt(self, model: str, call: Callable[[str, float], Awaitable[Optional[str]]]) -> Optional[str]:
+        timeout = self.timeout_for(model)
+        start = time.perf_counter()
+        try:
+            # The call enforces timeout itself so it can report it; this is only a backstop
+            result = await asyncio.wait_for(call(model, timeout), timeout=timeout + TIMEOUT_GRACE)
+        except CircuitOpenError:
+            # The host is failing fast, which says nothing about this model's health or latency
+            MODEL_REQUESTS.inc(model=model, outcome="circuit_open")
+            return None
+        except asyncio.TimeoutError:
+            logger.warning("Model %s timed out after %ss", model, timeout)
+            result = None
+        if result is None:
+            self.stats[model].record(False)
+            MODEL_REQUESTS.inc(model=model, outcome="error")
+        else:
+            self.stats[model].record(True, time.perf_counter() - start)
+            MODEL_REQUESTS.inc(model=model, outcome="ok")
+        return result
+
+    async def run(self, call: Callable[[str, float], Awaitable[Optional[str]]]) -> tuple[Optional[str], Optional[str]]:
+        """Call models in ranked order until one returns a result; returns the result and the model that produced it.
+
+        If the first model runs past its p95, the next model is fired
+        alongside it once and whichever answers first wins.
+        """
+        candidates = self.ranked()
+        running: dict[asyncio.Task, str] = {}
+        hedged = False
+
+        def start(model: str):
+            running[asyncio.ensure_future(self.attempt(model, call))] = model
+
+        start(candidates.pop(0))
+        try:
+            while running:
+                delay = None
+                if not hedged and candidates and len(running) == 1:
+                    delay = self.hedge_delay(next(iter(running.values())))
+                done, _ = await asyncio.wait(running, timeout=delay, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    hedged = True
+                    model = candidates.pop(0)
+                    MODEL_HEDGES.inc(model=model)
+                    start(model)
+                    continue
+                for task in done:
+                    model = running.pop(task)
+                    if task.result() is not None:
+                        return task.result(), model
+                if not running and candidates:
+                    start(candidates.pop(0))
+            return None, None
+        finally:
+            for task in running:
+                task.cancel()
+
+
+_model_router: Optional[ModelRouter] = None
+
+
+def get_model_router() -> ModelRouter:
+    """Return the process-wide router over the primary and fallback OpenRouter models"""
+    global _model_router
+    if _model_router is None:
+        models = [settings.openrouter_model]
+        models += [model for model in settings.openrouter_fallback_models if model not in models]
+        _model_router = ModelRouter(models)
+    return _model_router
@@ -0,0 +1,104 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Optional
+from sqlalchemy import text
+from src.config import settings
+from src.database import async_session_scope
+from src.utils.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMITED = REGISTRY.counter("rate_limited_total", "Slack requests rejected by the rate limiter", ["scope"])
+
+RATE_LIMITED_MESSAGE = "You're sending requests too quickly, please wait a moment and try again"
+
+
+class TokenBucketLimiter:
+    """In-memory token buckets, one per key, with the least recently used buckets dropped past max_keys"""
+
+    def __init__(self, capacity: float, refill_per_second: float, max_keys: int, clock: Callable[[], float] = time.monotonic):
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.max_keys = max_keys
+        self.clock = clock
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    async def allow(self, key: str) -> bool:
+        now = self.clock()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (self.capacity, now))
+            tokens = min(self.capacity, tokens + (now - updated) * self.refill_per_second)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            # A dropped bucket comes back full, which only ever errs towards allowing
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return allowed
+
+
+class PostgresTokenBucketLimiter:
+    """Token buckets shared by every worker, refilled and taken in a single conditional upsert"""
+
+    TAKE_TOKEN = text("""
+        INSERT INTO rate_limit_buckets (key, tokens, updated_at)
+        VALUES (:key, :capacity - 1, now())
+        ON CONFLICT (key) DO UPDATE SET
+            tokens = LEAST(:capacity, rate_limit_buckets.tokens
+                + EXTRACT(EPOCH FROM now() - rate_limit_buckets.updated_at) * :refill) - 1,
+            updated_at = now()
+        WHERE LEAST(:capacity, rate_limit_buckets.tokens
+            + EXTRACT(EPOCH FROM now() - rate_limit_buckets.updated_at) * :refill) >= 1
+        RETURNING tokens
+    """)
+
+    def __init__(self, capacity: float, refill_per_second: float):
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+
+    async def allow(self, key: str) -> bool:
+        try:
+            async with async_session_scope() as db:
+                result = await db.execute(
+                    self.TAKE_TOKEN,
+                    {"key": key, "capacity": self.capacity, "refill": self.refill_per_second}
+                )
+                allowed = result.first() is not None
+                await db.commit()
+            return allowed
+        except Exception as e:
+            # Fail open: a rate limiter outage should not take the bot down with it
+            logger.warning("Shared rate limiter unavailable: %s", e)
+            return True
+
+
+def build_limiter(capacity: float, refill_per_second: float):
+    if settings.rate_limit_backend == "postgres":
+        return PostgresTokenBucketLimiter(capacity, refill_per_second)
+    return TokenBucketLimiter(capacity, refill_per_second, settings.rate_limit_max_keys)
+
+
+_user_limiter = None
+_team_limiter = None
+
+
+async def allow_request(user_id: str, team_id: Optional[str]) -> bool:
+    """Take a token from the user's bucket and then the workspace's; False means reject the request"""
+    global _user_limiter, _team_limiter
+    if not settings.rate_limit_enabled:
+        return True
+    if _user_limiter is None:
+        _user_limiter = build_limiter(settings.rate_limit_user_capacity, settings.rate_limit_user_refill_per_second)
+        _team_limiter = build_limiter(settings.rate_limit_team_capacity, settings.rate_limit_team_refill_per_second)
+    if not await _user_limiter.allow(f"user:{user_id}"):
+        RATE_LIMITED.inc(scope="user")
+        return False
+    if team_id and not await _team_limiter.allow(f"team:{team_id}"):
+        RATE_LIMITED.inc(scope="team")
+        return False
+    return True
@@ -0,0 +1,99 @@
+import hashlib
+import json
+import logging
+from datetime import timedelta
+from typing import Optional
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.postgresql import insert
+from src.config import settings
+from src.database import async_session_scope
+from src.models.database import CachedResult, utcnow
+from src.utils.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+
+# A paraphrase is rewritten from scratch, so spacing does not change it; a grammar fix keeps
+# the input's layout, and spacing may be what it fixes
+WHITESPACE_INSENSITIVE = frozenset({"paraphrase"})
+
+
+def normalize_text(text: str) -> str:
+    return " ".join(text.split())
+
+
+def key_text(operation: str, text: str) -> str:
+    """The part of text that identifies a request for operation"""
+    return normalize_text(text) if operation in WHITESPACE_INSENSITIVE else text
+
+
+def result_cache_key(operation: str, text: str, tone: Optional[str], model: str, prompt_version: str) -> str:
+    """Content address for one model call; tone case, and whitespace where the operation ignores it, do not matter"""
+    parts = [operation, key_text(operation, text), (tone or "").strip().lower(), model, prompt_version]
+    return hashlib.sha256(json.dumps(parts, ensure_ascii=False).encode()).hexdigest()
+
+
+class ResultCache:
+    """In-memory LRU of model results with an optional Postgres tier behind it"""
+
+    def __init__(self):
+        self.memory = TTLCache("paraphrase_results", maxsize=settings.result_cache_size, ttl=settings.result_cache_ttl)
+        self.use_db = settings.result_cache_db
+        self.db_ttl = settings.result_cache_db_ttl
+
+    async def get(self, key: str) -> Optional[str]:
+        result = self.memory.get(key)
+        if result is not None or not self.use_db:
+            return result
+        try:
+            async with async_session_scope() as db:
+                row = await db.execute(
+                    select(CachedResult.result).where(
+                        CachedResult.key == key,
+                        CachedResult.created_at > utcnow() - timedelta(seconds=self.db_ttl)
+                    )
+                )
+                result = row.scalar_one_or_none()
+        except Exception as e:
+            logger.warning("Result cache lookup failed: %s", e)
+            return None
+        if result is not None:
+            self.memory.set(key, result)
+        return result
+
+    async def set(self, key: str, operation: str, result: str):
+        self.memory.set(key, result)
+        if not self.use_db:
+            return
+        try:
+            async with async_session_scope() as db:
+                stmt = insert(CachedResult).values(key=key, operation=operation, result=result)
+                await db.execute(stmt.on_conflict_do_update(
+                    index_elements=[CachedResult.key],
+                    set_={"result": stmt.excluded.result, "created_at": stmt.excluded.created_at}
+                ))
+                await db.commit()
+        except Exception as e:
+            logger.warning("Result cache write failed: %s", e)
+
+    async def purge_expired(self) -> int:
+        """Delete Postgres rows past their TTL, which reads already ignore; returns how many went"""
+        if not self.use_db:
+            return 0
+        async with async_session_scope() as db:
+            result = await db.execute(
+                delete(CachedResult).where(CachedResult.created_at <= utcnow() - timedelta(seconds=self.db_ttl))
+            )
+            await db.commit()
+        return result.rowcount
+
+
+_result_cache: Optional[ResultCache] = None
+
+
+def get_result_cache() -> ResultCache:
+    """Return the process-wide paraphrase result cache"""
+    global _result_cache
+    if _result_cache is None:
+        _result_cache = ResultCache()
+    return _result_cache
@@ -1,9 +1,130 @@
+import asyncio
 import httpx
+import logging
+import random
+import time
+from typing import AsyncIterator, Callable, Optional
+from src.config import settings
+from src.services.http import get_slack_client
+from src.utils.circuit_breaker import get_circuit_breaker
+from src.utils.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+SLACK_POSTS = REGISTRY.counter("slack_posts_total", "Slack response_url posts by final outcome", ["outcome"])
+SLACK_POST_RETRIES = REGISTRY.counter("slack_post_retries_total", "Slack response_url attempts retried after a failure")
+SLACK_POST_LATENCY = REGISTRY.histogram(
+    "slack_post_latency_seconds",
+    "Time to deliver a Slack response_url post, including retries",
+    buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+)
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+_slack_service: Optional["SlackService"] = None
+
 
 class SlackService:
     def __init__(self):
-        self.client = httpx.AsyncClient()
+        self.semaphore = asyncio.Semaphore(settings.slack_max_concurrency)
+        self.max_retries = settings.slack_max_retries
+        self.base_delay = settings.slack_retry_base_delay
+        self.max_delay = settings.slack_retry_max_delay
+        self.stream_update_interval = settings.slack_stream_update_interval
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        return get_slack_client()
+
+    async def send_action_response(self, response_url: str, layout: dict) -> bool:
+        """Post a layout to a Slack response_url, retrying on 429/5xx and transport errors"""
+        with SLACK_POST_LATENCY.time():
+            ok = await self.post_with_retries(response_url, layout)
+        SLACK_POSTS.inc(outcome="ok" if ok else "failed")
+        return ok
+
+    async def post_with_retries(self, response_url: str, layout: dict) -> bool:
+        breaker = get_circuit_breaker(response_url)
+        for attempt in range(self.max_retries + 1):
+            if not breaker.allow():
+                logger.error("Slack circuit %s open, dropping response_url post", breaker.name)
+                return False
+            retry_after = None
+            healthy = None
+            try:
+                async with self.semaphore:
+                    response = await self.client.post(response_url, json=layout)
+            except httpx.TransportError as e:
+                healthy = False
+                error = str(e) or type(e).__name__
+            else:
+                # 429s are per response_url, so only server errors count against the host
+                healthy = response.status_code < 500
+                if response.status_code not in RETRYABLE_STATUS_CODES:
+                    if not response.is_success:
+                        logger.error("Slack response_url error %s: %s", response.status_code, response.text)
+                    return response.is_success
+                error = f"status {response.status_code}"
+                retry_after = self.get_retry_after(response)
+            finally:
+                breaker.record(healthy)
+
+            if attempt == self.max_retries:
+                logger.error("Giving up on Slack response_url after %s attempts: %s", attempt + 1, error)
+                return False
+            delay = retry_after if retry_after is not None else self.get_backoff_delay(attempt)
+            logger.warning("Slack response_url attempt %s failed (%s), retrying in %.2fs", attempt + 1, error, delay)
+            SLACK_POST_RETRIES.inc()
+            await asyncio.sleep(delay)
+        return False
+
+    async def stream_action_response(
+        self,
+        response_url: str,
+        chunks: AsyncIterator[str],
+        render: Callable[[str], dict]
+    ) -> str:
+        """Replace the original message with the text received so far, then return the full text.
+
+        Updates go out at most once per stream_update_interval and never
+        overlap; a tick that finds the previous update still in flight is
+        skipped rather than queued, so a slow Slack never stalls the stream.
+        """
+        text = ""
+        last_update = 0.0
+        update: Optional[asyncio.Task] = None
+        try:
+            async for chunk in chunks:
+                text += chunk
+                now = time.monotonic()
+                if now - last_update < self.stream_update_interval or (update is not None and not update.done()):
+                    continue
+                last_update = now
+                layout = {**render(text), "replace_original": True}
+                update = asyncio.create_task(self.send_action_response(response_url, layout))
+        finally:
+            # Let the last partial update land before the caller posts the final message
+            if update is not None:
+                await asyncio.gather(update, return_exceptions=True)
+        return text
+
+    def get_backoff_delay(self, attempt: int) -> float:
+        # Full jitter keeps retries from a burst of failures from re-synchronising
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def get_retry_after(self, response: httpx.Response) -> Optional[float]:
+        value = response.headers.get("Retry-After")
+        if value is None:
+            return None
+        try:
+            return min(self.max_delay, max(0.0, float(value)))
+        except ValueError:
+            return None
+
 
-    async def send_action_response(self, response_url: str, layout: dict):
-        async with httpx.AsyncClient() as client:
-            await client.post(response_url, json=layout)
\ No newline at end of file
+def get_slack_service() -> SlackService:
+    """Return the process-wide SlackService dispatcher"""
+    global _slack_service
+    if _slack_service is None:
+        _slack_service = SlackService()
+    return _slack_service
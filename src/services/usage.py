@@ -0,0 +1,151 @@
+import asyncio
+import logging
+from datetime import timedelta
+from typing import Optional
+from sqlalchemy import func, insert, select
+from src.config import settings
+from src.database import async_session_scope
+from src.models.database import ModelUsage, utcnow
+from src.utils.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+MODEL_TOKENS = REGISTRY.counter("model_tokens_total", "Tokens billed by upstream models", ["model", "kind"])
+MODEL_UPSTREAM_LATENCY = REGISTRY.histogram(
+    "model_upstream_latency_seconds",
+    "Latency of successful upstream model calls",
+    ["model"],
+    buckets=(0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0)
+)
+MODEL_TRUNCATED = REGISTRY.counter("model_truncated_total", "Completions cut off by the max_tokens budget", ["model"])
+
+# Rough characters-per-token ratio for English text, used before the model tells us the real count
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    return max(1, -(-len(text) // CHARS_PER_TOKEN))
+
+
+def completion_budget(text: str) -> int:
+    """max_tokens for a rewrite of text: proportional to its length, never above the configured cap"""
+    budget = int(estimate_tokens(text) * settings.completion_token_ratio) + settings.completion_token_floor
+    return min(budget, settings.completion_token_cap)
+
+
+class UsageRecorder:
+    """Buffers per-call token and latency records and writes them to model_usage in batches"""
+
+    def __init__(self):
+        self.pending: list[dict] = []
+        self.flush_task: Optional[asyncio.Task] = None
+
+    def record(
+        self,
+        slack_user_id: Optional[str],
+        model: str,
+        operation: str,
+        prompt_tokens: int,
+        completion_tokens: int,
+        latency: float
+    ):
+        MODEL_TOKENS.inc(prompt_tokens, model=model, kind="prompt")
+        MODEL_TOKENS.inc(completion_tokens, model=model, kind="completion")
+        MODEL_UPSTREAM_LATENCY.observe(latency, model=model)
+        if not settings.usage_tracking_enabled:
+            return
+        self.pending.append({
+            "slack_user_id": slack_user_id,
+            "model": model,
+            "operation": operation,
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "latency_ms": int(latency * 1000),
+            "created_at": utcnow()
+        })
+        if len(self.pending) >= settings.usage_batch_size:
+            self.schedule_flush(0)
+        elif self.flush_task is None:
+            self.schedule_flush(settings.usage_flush_interval)
+
+    def schedule_flush(self, delay: float):
+        if self.flush_task is not None and not self.flush_task.done():
+            if delay > 0:
+                return
+            self.flush_task.cancel()
+        self.flush_task = asyncio.create_task(self.flush_after(delay))
+
+    async def flush_after(self, delay: float):
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            return
+        self.flush_task = None
+        await self.flush()
+
+    async def flush(self):
+        """Write everything buffered so far; records are dropped rather than retried if the insert fails"""
+        rows, self.pending = self.pending, []
+        if not rows:
+            return
+        try:
+            async with async_session_scope() as db:
+                await db.execute(insert(ModelUsage), rows)
+                await db.commit()
+        except Exception as e:
+            logger.error("Failed to write %s model usage records: %s", len(rows), e)
+
+    async def close(self):
+        if self.flush_task is not None:
+            self.flush_task.cancel()
+            self.flush_task = None
+        await self.flush()
+
+
+_usage_recorder: Optional[UsageRecorder] = None
+
+
+def get_usage_recorder() -> UsageRecorder:
+    """Return the process-wide usage recorder"""
+    global _usage_recorder
+    if _usage_recorder is None:
+        _usage_recorder = UsageRecorder()
+    return _usage_recorder
+
+
+async def close_usage_recorder():
+    if _usage_recorder is not None:
+        await _usage_recorder.close()
+
+
+async def usage_stats(group_by: str, hours: float = 24, limit: int = 100) -> list[dict]:
+    """Token and latency totals over the last hours, grouped by slack user or by model, most tokens first"""
+    column = ModelUsage.slack_user_id if group_by == "user" else ModelUsage.model
+    total_tokens = func.sum(ModelUsage.prompt_tokens + ModelUsage.completion_tokens)
+    query = (
+        select(
+            column.label("key"),
+            func.count().label("calls"),
+            func.sum(ModelUsage.prompt_tokens).label("prompt_tokens"),
+            func.sum(ModelUsage.completion_tokens).label("completion_tokens"),
+            func.avg(ModelUsage.latency_ms).label("avg_latency_ms"),
+            func.percentile_cont(0.95).within_group(ModelUsage.latency_ms).label("p95_latency_ms")
+        )
+        .where(ModelUsage.created_at > utcnow() - timedelta(hours=hours))
+        .group_by(column)
+        .order_by(total_tokens.desc())
+        .limit(limit)
+    )
+    async with async_session_scope() as db:
+        rows = (await db.execute(query)).all()
+    return [
+        {
+            group_by: row.key,
+            "calls": row.calls,
+            "prompt_tokens": int(row.prompt_tokens or 0),
+            "completion_tokens": int(row.completion_tokens or 0),
+            "avg_latency_ms": round(float(row.avg_latency_ms or 0), 1),
+            "p95_latency_ms": round(float(row.p95_latency_ms or 0), 1)
+        }
+        for row in rows
+    ]
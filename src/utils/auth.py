@@ -1,4 +1,4 @@
-from fastapi import Request
+from fastapi import HTTPException, Request
 from src.config import settings
 from src.models.database import User
 
@@ -32,4 +32,12 @@ async def verify_slack_request(request: Request):
 def check_user_credits(user: User):
     if not user:
         return False
-    return user.credits_assigned > user.credits_used
+    return user.credits_assigned > user.credits_used + (user.credits_reserved or 0)
+
+def verify_admin_token(authorization: str | None):
+    """Check the bearer token of an internal API call; the API does not exist unless a token is configured"""
+    if not settings.admin_api_token:
+        raise HTTPException(status_code=404, detail="Not Found")
+    expected = f"Bearer {settings.admin_api_token}"
+    if not authorization or not hmac.compare_digest(authorization, expected):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
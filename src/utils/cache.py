@@ -0,0 +1,72 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+from src.utils.metrics import REGISTRY
+
+CACHE_HITS = REGISTRY.counter("cache_hits_total", "Cache lookups that found a live entry", ["cache"])
+CACHE_MISSES = REGISTRY.counter("cache_misses_total", "Cache lookups that found nothing or an expired entry", ["cache"])
+CACHE_EVICTIONS = REGISTRY.counter("cache_evictions_total", "Entries dropped to stay within the cache size", ["cache"])
+CACHE_ENTRIES = REGISTRY.gauge("cache_entries", "Entries currently held by the cache", ["cache"])
+
+_MISSING = object()
+
+
+class TTLCache:
+    """Bounded LRU cache whose entries also expire ttl seconds after being set"""
+
+    def __init__(self, name: str, maxsize: int, ttl: float, clock: Callable[[], float] = time.monotonic):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+        CACHE_ENTRIES.set_function(lambda: len(self._data), cache=name)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is not _MISSING:
+                expires_at, value = entry
+                if expires_at > self.clock():
+                    self._data.move_to_end(key)
+                    CACHE_HITS.inc(cache=self.name)
+                    return value
+                del self._data[key]
+        CACHE_MISSES.inc(cache=self.name)
+        return default
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        if self.maxsize <= 0:
+            return
+        expires_at = self.clock() + (self.ttl if ttl is None else ttl)
+        evicted = 0
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                evicted += 1
+        if evicted:
+            CACHE_EVICTIONS.inc(evicted, cache=self.name)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.pop(key, _MISSING)
+        return default if entry is _MISSING else entry[1]
+
+    def discard_where(self, predicate: Callable[[Any], bool]) -> int:
+        """Drop every entry whose value matches predicate, returning how many were dropped"""
+        with self._lock:
+            keys = [key for key, (_, value) in self._data.items() if predicate(value)]
+            for key in keys:
+                del self._data[key]
+        return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
@@ -0,0 +1,106 @@
+import logging
+import time
+from typing import Callable, Optional
+from urllib.parse import urlsplit
+from src.config import settings
+from src.utils.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+CIRCUIT_STATE = REGISTRY.gauge("circuit_state", "Circuit breaker state per upstream (0 closed, 1 half-open, 2 open)", ["name"], aggregate="max")
+CIRCUIT_REJECTED = REGISTRY.counter("circuit_rejected_total", "Calls failed fast by an open circuit", ["name"])
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+class CircuitBreaker:
+    """Closed/open/half-open breaker for one upstream.
+
+    failure_threshold consecutive failures open the circuit and calls fail
+    fast. After recovery_timeout it goes half-open and lets up to
+    half_open_max_calls probes through: a success closes it, a failure
+    opens it again.
+    """
+
+    def __init__(self, name: str, failure_threshold: int, recovery_timeout: float, half_open_max_calls: int, clock: Callable[[], float] = time.monotonic):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self.clock = clock
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probes = 0
+        CIRCUIT_STATE.set_function(lambda: STATE_VALUES[self.state], name=name)
+
+    @property
+    def state(self) -> str:
+        if self._state == OPEN and self.clock() - self._opened_at >= self.recovery_timeout:
+            self._state = HALF_OPEN
+            self._probes = 0
+            logger.info("Circuit %s half-open, probing", self.name)
+        return self._state
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == CLOSED:
+            return True
+        if state == HALF_OPEN and self._probes < self.half_open_max_calls:
+            self._probes += 1
+            return True
+        CIRCUIT_REJECTED.inc(name=self.name)
+        return False
+
+    def record_success(self):
+        self.release()
+        if self._state != CLOSED:
+            logger.info("Circuit %s closed", self.name)
+        self._state = CLOSED
+        self._failures = 0
+
+    def record_failure(self):
+        self.release()
+        self._failures += 1
+        if self._state == HALF_OPEN or (self._state == CLOSED and self._failures >= self.failure_threshold):
+            self._state = OPEN
+            self._opened_at = self.clock()
+            logger.warning("Circuit %s opened after %s consecutive failures", self.name, self._failures)
+
+    def record(self, ok: Optional[bool]):
+        """Report a call's outcome; None means no verdict, such as a cancelled call"""
+        if ok is None:
+            self.release()
+        elif ok:
+            self.record_success()
+        else:
+            self.record_failure()
+
+    def release(self):
+        """Give back a half-open probe slot without reporting an outcome, e.g. when the call was cancelled"""
+        self._probes = max(0, self._probes - 1)
+
+
+_breakers: dict[str, CircuitBreaker] = {}
+
+
+def get_circuit_breaker(url: str) -> CircuitBreaker:
+    """Return the breaker for the host of url, creating it on first use"""
+    name = urlsplit(url).hostname or url
+    breaker = _breakers.get(name)
+    if breaker is None:
+        breaker = _breakers[name] = CircuitBreaker(
+            name,
+            failure_threshold=settings.circuit_failure_threshold,
+            recovery_timeout=settings.circuit_recovery_timeout,
+            half_open_max_calls=settings.circuit_half_open_max_calls,
+        )
+    return breaker
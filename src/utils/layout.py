@@ -50,6 +50,27 @@ def get_rephrase_response_layout(text: str, paraphrased_text: str, user_id: str)
         ]
     }
 
+def get_streaming_layout(text: str, partial_text: str):
+    return {
+        "response_type": "ephemeral",
+        "blocks": [
+            {
+                "type": "section",
+                "text": {
+                    "type": "mrkdwn",
+                    "text": "*Original Text:*\n" + text
+                },
+            },
+            {
+                "type": "section",
+                "text": {
+                    "type": "mrkdwn",
+                    "text": "*Suggested Text:*\n" + partial_text + " ..."
+                },
+            }
+        ]
+    }
+
 def get_processing_layout():
     return {
         "response_type": "ephemeral",
@@ -0,0 +1,176 @@
+import contextvars
+import json
+import logging
+import os
+import queue
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Iterator, Optional
+from src.config import settings
+from src.utils.metrics import REGISTRY
+
+LOG_RECORDS_DROPPED = REGISTRY.counter("log_records_dropped_total", "Log records dropped because the log queue was full", ["level"])
+LOG_QUEUE_DEPTH = REGISTRY.gauge("log_queue_depth", "Log records waiting for the log writer thread")
+
+# Attributes every LogRecord has; anything else was passed with extra= and is logged as a field
+RESERVED_ATTRS = frozenset(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+_log_context: contextvars.ContextVar[Optional[dict]] = contextvars.ContextVar("log_context", default=None)
+_listener: Optional["LogWriter"] = None
+
+
+@contextmanager
+def log_context(**fields) -> Iterator[dict]:
+    """Attach fields to every record logged inside the block, including from tasks it starts"""
+    context = {**(_log_context.get() or {}), **fields}
+    token = _log_context.set(context)
+    try:
+        yield context
+    finally:
+        _log_context.reset(token)
+
+
+def bind_log_context(**fields):
+    """Add fields to the current request's or job's log context"""
+    context = _log_context.get()
+    if context is not None:
+        # Updated in place so the request middleware sees fields bound inside the handler
+        context.update(fields)
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """Hands records to the writer thread without ever waiting; a full queue drops the record and counts it"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Interpolate here, while args still hold their current values; JSON encoding,
+        # traceback formatting and I/O happen on the writer thread
+        record.msg = record.getMessage()
+        record.args = None
+        for key, value in (_log_context.get() or {}).items():
+            if not hasattr(record, key):
+                setattr(record, key, value)
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_RECORDS_DROPPED.inc(level=record.levelname)
+
+
+class LogWriter(QueueListener):
+    def enqueue_sentinel(self):
+        # Wait for room so a full queue cannot prevent shutdown
+        self.queue.put(self._sentinel)
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line with the request context and any extra= fields"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in RESERVED_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+def get_log_handler(filename: Optional[str] = "app.log") -> logging.Handler:
+    """Logtail in production, otherwise a rotating file (stderr when filename is None).
+
+    The Logtail SDK is only imported when used.
+    """
+    if os.getenv("ENV", "dev") == "prod":
+        from logtail import LogtailHandler
+        # Logtail ships record attributes as structured fields itself
+        return LogtailHandler(
+            source_token=settings.logtail_source_token,
+            host=settings.logtail_host
+        )
+    if filename is None:
+        handler = logging.StreamHandler()
+    else:
+        handler = RotatingFileHandler(
+            filename,
+            maxBytes=1024 * 1024,  # 1MB
+            backupCount=5
+        )
+    if settings.log_format == "json":
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+    return handler
+
+
+def configure_logging(handler: Optional[logging.Handler] = None):
+    """Route the root logger through a bounded queue to a writer thread that owns the real handler"""
+    global _listener
+    stop_logging()
+    log_queue = queue.Queue(maxsize=settings.log_queue_size)
+    LOG_QUEUE_DEPTH.set_function(log_queue.qsize)
+    _listener = LogWriter(log_queue, handler or get_log_handler(), respect_handler_level=True)
+    _listener.start()
+
+    logger = logging.getLogger()
+    logger.setLevel(settings.log_level)
+    logger.handlers = [NonBlockingQueueHandler(log_queue)]
+
+
+def stop_logging():
+    """Write out queued records and stop the writer thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+class RequestContextMiddleware:
+    """ASGI middleware giving each request a log context and one access record with its latency.
+
+    The request id is taken from X-Request-ID when the caller sends one.
+    Background tasks of the request log with the same context.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.logger = logging.getLogger("src.access")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        request_id = headers.get(b"x-request-id", b"").decode("latin-1") or uuid.uuid4().hex
+        start = time.perf_counter()
+        status = 500
+        logged = False
+
+        with log_context(request_id=request_id, endpoint=scope["path"]) as context:
+            async def send_wrapper(message):
+                nonlocal status, logged
+                if message["type"] == "http.response.start":
+                    status = message["status"]
+                    message = {**message, "headers": [*message.get("headers", []), (b"x-request-id", request_id.encode("latin-1"))]}
+                await send(message)
+                if not logged and message["type"] == "http.response.body" and not message.get("more_body", False):
+                    logged = True
+                    route = scope.get("route")
+                    context["endpoint"] = getattr(route, "path", scope["path"])
+                    self.logger.info(
+                        "%s %s %s",
+                        scope["method"], context["endpoint"], status,
+                        extra={"status": status, "latency_ms": round((time.perf_counter() - start) * 1000, 2)}
+                    )
+
+            await self.app(scope, receive, send_wrapper)
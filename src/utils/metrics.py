@@ -0,0 +1,346 @@
+import json
+import os
+import socket
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterable, Optional
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Metric:
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: dict = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> tuple:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def labels_for(self, key: tuple) -> dict:
+        return dict(zip(self.labelnames, key))
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def get(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def samples(self):
+        for key, value in list(self._values.items()):
+            yield self.name, self.labels_for(key), value
+
+
+class Gauge(Metric):
+    type = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (), aggregate: str = "sum"):
+        super().__init__(name, documentation, labelnames)
+        # How values from several worker processes combine: "sum" or "max"
+        self.aggregate = aggregate
+        self._functions: dict[tuple, Callable[[], float]] = {}
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+    def set_function(self, function: Callable[[], float], **labels):
+        """Read the value lazily at collection time instead of tracking it"""
+        self._functions[self._key(labels)] = function
+
+    def get(self, **labels) -> float:
+        key = self._key(labels)
+        if key in self._functions:
+            return float(self._functions[key]())
+        return self._values.get(key, 0.0)
+
+    def samples(self):
+        for key, value in list(self._values.items()):
+            yield self.name, self.labels_for(key), value
+        for key, function in list(self._functions.items()):
+            yield self.name, self.labels_for(key), float(function())
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (), buckets: Iterable[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state["buckets"][index] += 1
+                    break
+            state["sum"] += value
+            state["count"] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def snapshot(self, **labels) -> Optional[dict]:
+        """Cumulative bucket counts, sum and count for one label set"""
+        state = self._values.get(self._key(labels))
+        if state is None:
+            return None
+        cumulative, running = {}, 0
+        for bound, count in zip(self.buckets, state["buckets"]):
+            running += count
+            cumulative[bound] = running
+        return {"buckets": cumulative, "sum": state["sum"], "count": state["count"]}
+
+    def samples(self):
+        for key, state in list(self._values.items()):
+            labels = self.labels_for(key)
+            running = 0
+            for bound, count in zip(self.buckets, state["buckets"]):
+                running += count
+                yield f"{self.name}_bucket", {**labels, "le": repr(bound)}, running
+            yield f"{self.name}_bucket", {**labels, "le": "+Inf"}, state["count"]
+            yield f"{self.name}_sum", labels, state["sum"]
+            yield f"{self.name}_count", labels, state["count"]
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name: str, documentation: str, labelnames: Iterable[str], **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, documentation, labelnames, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Metric {name} already registered as {metric.type}")
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames: Iterable[str] = (), aggregate: str = "sum") -> Gauge:
+        return self._get_or_create(Gauge, name, documentation, labelnames, aggregate=aggregate)
+
+    def histogram(self, name: str, documentation: str, labelnames: Iterable[str] = (), buckets: Iterable[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def collect(self) -> list[Metric]:
+        return list(self._metrics.values())
+
+
+REGISTRY = MetricsRegistry()
+
+
+def snapshot_name() -> str:
+    # Processes in different containers can share a pid, so the host is part of the name
+    return f"{socket.gethostname()}-{os.getpid()}.json"
+
+
+def registry_snapshot(registry: MetricsRegistry = REGISTRY) -> dict:
+    """Current samples of every metric, in a JSON-friendly form other processes can merge"""
+    return {
+        "host": socket.gethostname(),
+        "pid": os.getpid(),
+        "written_at": time.time(),
+        "metrics": [
+            {
+                "name": metric.name,
+                "type": metric.type,
+                "help": metric.documentation,
+                "aggregate": getattr(metric, "aggregate", "sum"),
+                "samples": [[name, labels, value] for name, labels, value in metric.samples()],
+            }
+            for metric in registry.collect()
+        ],
+    }
+
+
+def write_snapshot(directory: str, registry: MetricsRegistry = REGISTRY):
+    """Atomically replace this process's snapshot file in directory"""
+    path = os.path.join(directory, snapshot_name())
+    with open(f"{path}.tmp", "w") as f:
+        json.dump(registry_snapshot(registry), f)
+    os.replace(f"{path}.tmp", path)
+
+
+def remove_snapshot(directory: str):
+    """Delete this process's snapshot file, e.g. when it exits"""
+    try:
+        os.remove(os.path.join(directory, snapshot_name()))
+    except FileNotFoundError:
+        pass
+
+
+def read_snapshots(directory: str, max_age: float) -> list[dict]:
+    """Snapshots written by other running processes.
+
+    A snapshot from this host belongs to a running process if its pid is
+    alive; one from another host (another container) if it was written in
+    the last max_age seconds. Other snapshots are deleted.
+    """
+    snapshots = []
+    host = socket.gethostname()
+    for filename in os.listdir(directory):
+        if not filename.endswith(".json") or filename == snapshot_name():
+            continue
+        path = os.path.join(directory, filename)
+        try:
+            with open(path) as f:
+                snapshot = json.load(f)
+        except (OSError, ValueError):
+            continue
+        if snapshot.get("host") == host:
+            alive = process_alive(snapshot["pid"])
+        else:
+            alive = time.time() - snapshot.get("written_at", 0) <= max_age
+        if alive:
+            snapshots.append(snapshot)
+            continue
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+    return snapshots
+
+
+def process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def merge_snapshots(snapshots: list[dict]) -> list[dict]:
+    """Combine per-process snapshots into one set of metric families.
+
+    Counters and histograms are summed; gauges are summed or maxed per the
+    gauge's aggregate. When a worker exits its counts drop out of the sums,
+    which Prometheus treats as a counter reset.
+    """
+    families: dict[str, dict] = {}
+    for snapshot in snapshots:
+        for metric in snapshot["metrics"]:
+            family = families.setdefault(metric["name"], {**metric, "samples": {}})
+            for name, labels, value in metric["samples"]:
+                key = (name, tuple(sorted(labels.items())))
+                sample = family["samples"].get(key)
+                if sample is None:
+                    family["samples"][key] = [name, labels, value]
+                elif metric["type"] == "gauge" and metric["aggregate"] == "max":
+                    sample[2] = max(sample[2], value)
+                else:
+                    sample[2] += value
+    return [{**family, "samples": list(family["samples"].values())} for family in families.values()]
+
+
+def format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if value == float("-inf"):
+        return "-Inf"
+    return repr(float(value))
+
+
+def escape_label(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def render_metrics(families: list[dict]) -> str:
+    """Prometheus text exposition format (version 0.0.4)"""
+    lines = []
+    for family in families:
+        lines.append(f"# HELP {family['name']} {family['help']}")
+        lines.append(f"# TYPE {family['name']} {family['type']}")
+        for name, labels, value in family["samples"]:
+            if labels:
+                label_text = ",".join(f'{key}="{escape_label(label)}"' for key, label in labels.items())
+                lines.append(f"{name}{{{label_text}}} {format_value(value)}")
+            else:
+                lines.append(f"{name} {format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+HTTP_REQUEST_LATENCY = REGISTRY.histogram(
+    "http_request_duration_seconds",
+    "Time from receiving a request to sending the last response byte",
+    ["method", "route"],
+)
+
+DB_POOL_CHECKOUT_WAIT = REGISTRY.histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time a background job waited for a database connection from the pool",
+)
+
+DB_POOL_CONNECTIONS = REGISTRY.gauge(
+    "db_pool_connections",
+    "Connections in the async database pool by state",
+    ["state"],
+)
+
+
+class LatencyMiddleware:
+    """ASGI middleware recording handler latency per route template.
+
+    The clock stops when the final response body is sent, so background
+    tasks that run afterwards are not counted against the handler.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        recorded = False
+
+        async def send_wrapper(message):
+            nonlocal recorded
+            await send(message)
+            if not recorded and message["type"] == "http.response.body" and not message.get("more_body", False):
+                recorded = True
+                route = scope.get("route")
+                HTTP_REQUEST_LATENCY.observe(
+                    time.perf_counter() - start,
+                    method=scope["method"],
+                    route=getattr(route, "path", "unmatched"),
+                )
+
+        await self.app(scope, receive, send_wrapper)
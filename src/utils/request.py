@@ -6,4 +6,5 @@ async def parse_request(request: Request):
     user_id = form_data.get("user_id")
     user_name = form_data.get("user_name")
     response_url = form_data.get("response_url")
-    return text, user_id, user_name, response_url
\ No newline at end of file
+    team_id = form_data.get("team_id")
+    return text, user_id, user_name, response_url, team_id
\ No newline at end of file
@@ -0,0 +1,52 @@
+import asyncio
+from typing import Awaitable, Callable, Hashable, TypeVar
+from src.utils.metrics import REGISTRY
+
+T = TypeVar("T")
+
+SINGLEFLIGHT_CALLS = REGISTRY.counter("singleflight_calls_total", "Calls that started a new in-flight request", ["group"])
+SINGLEFLIGHT_SHARED = REGISTRY.counter("singleflight_shared_total", "Calls that joined a request already in flight", ["group"])
+
+
+class SingleFlight:
+    """Share one in-flight call among concurrent callers asking for the same key"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: dict[Hashable, asyncio.Task] = {}
+
+    async def do(
+        self,
+        key: Hashable,
+        fn: Callable[[], Awaitable[T]],
+        private_errors: tuple[type[BaseException], ...] = ()
+    ) -> T:
+        """Run fn, or join the call already in flight for key.
+
+        Errors of a private_errors type concern only the caller that started
+        the call, e.g. its own admission being refused; callers that joined
+        it start or join a new call instead of failing with it.
+        """
+        while True:
+            task = self._calls.get(key)
+            started = task is None
+            if started:
+                task = asyncio.ensure_future(fn())
+                self._calls[key] = task
+                task.add_done_callback(lambda done: self._forget(key, done))
+                SINGLEFLIGHT_CALLS.inc(group=self.name)
+            else:
+                SINGLEFLIGHT_SHARED.inc(group=self.name)
+            try:
+                # Shielded so one caller being cancelled does not cancel the call for the others
+                return await asyncio.shield(task)
+            except private_errors:
+                if started:
+                    raise
+
+    def _forget(self, key: Hashable, task: asyncio.Task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+
+    def __len__(self) -> int:
+        return len(self._calls)
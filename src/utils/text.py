@@ -1,3 +1,5 @@
+import re
+
 def parse_command(text: str) -> tuple[str, str | None]:
     """
     Parse the text to extract the text to rephrase and optional tone.
@@ -26,4 +28,45 @@ def get_latest_paraphrase(latest_paraphrases):
     latest_paraphrase = latest_paraphrases[0]
     original_text = latest_paraphrase.original_text
     paraphrased_text = latest_paraphrase.paraphrased_text
-    return original_text, paraphrased_text
\ No newline at end of file
+    return original_text, paraphrased_text
+
+PARAGRAPH_BREAK = re.compile(r"(\n\s*\n)")
+SENTENCE_BREAK = re.compile(r"(?<=[.!?])(\s+)")
+WORD_BREAK = re.compile(r"(\s+)")
+
+def split_text(text: str, max_chars: int) -> list[tuple[str, str]]:
+    """
+    Split text into chunks of at most max_chars, breaking on paragraphs first,
+    then sentences, then words.
+    Returns (chunk, separator) pairs; joining every chunk + separator gives back the text.
+    """
+    if len(text) <= max_chars:
+        return [(text, "")]
+    units = _split_units(text, max_chars, [PARAGRAPH_BREAK, SENTENCE_BREAK, WORD_BREAK])
+    # Pack consecutive units into chunks as large as max_chars allows
+    chunks = []
+    current, pending = None, ""
+    for unit, separator in units:
+        if current is not None and len(current) + len(pending) + len(unit) > max_chars:
+            chunks.append((current, pending))
+            current = unit
+        else:
+            current = unit if current is None else current + pending + unit
+        pending = separator
+    chunks.append((current or "", pending))
+    return chunks
+
+def _split_units(text: str, max_chars: int, patterns: list[re.Pattern]) -> list[tuple[str, str]]:
+    if len(text) <= max_chars:
+        return [(text, "")]
+    if not patterns:
+        return [(text[i:i + max_chars], "") for i in range(0, len(text), max_chars)]
+    parts = patterns[0].split(text)
+    units = []
+    for i in range(0, len(parts), 2):
+        separator = parts[i + 1] if i + 1 < len(parts) else ""
+        pieces = _split_units(parts[i], max_chars, patterns[1:])
+        last, trailing = pieces[-1]
+        pieces[-1] = (last, trailing + separator)
+        units.extend(pieces)
+    return units
@@ -0,0 +1,116 @@
+"""
+Job queue worker. Runs N async consumers that claim jobs from Postgres and
+execute the registered handlers.
+
+    python -m src.worker --concurrency 10
+"""
+import argparse
+import asyncio
+import logging
+import signal
+from src.config import settings
+from src.database import async_session_scope, close_async_engine
+from src.services.http import open_http_clients, close_http_clients
+from src.services.credits import CreditLedger
+from src.services.result_cache import get_result_cache
+from src.migrate import check_schema
+from src.services.jobs import JobQueue, get_job_handler, running_job
+from src.services.metrics import start_metrics_export, stop_metrics_export
+from src.services.usage import close_usage_recorder
+from src.utils.log import configure_logging, get_log_handler, log_context, stop_logging
+# Importing the routes registers their job handlers
+from src.routes import rephrase  # noqa: F401
+
+logger = logging.getLogger(__name__)
+
+
+async def run_next_job() -> bool:
+    """Claim and run one job, returning False when none was due"""
+    async with async_session_scope() as db:
+        queue = JobQueue(db)
+        job = await queue.claim()
+        if job is None:
+            return False
+        handler = get_job_handler(job.kind)
+        try:
+            if handler is None:
+                raise LookupError(f"No handler registered for job kind {job.kind}")
+            with running_job(job), log_context(job_id=str(job.id), job_kind=job.kind, user_id=job.payload.get("user_id")):
+                await handler(**job.payload)
+        except Exception as e:
+            logger.error("Job %s (%s) attempt %s failed: %s", job.id, job.kind, job.attempts, e, exc_info=True)
+            await queue.fail(job, str(e))
+        else:
+            await queue.complete(job)
+        return True
+
+
+async def consume(stop: asyncio.Event):
+    while not stop.is_set():
+        try:
+            ran = await run_next_job()
+        except Exception as e:
+            logger.error("Job consumer error: %s", e, exc_info=True)
+            ran = False
+        if not ran:
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=settings.job_poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+
+async def sweep(stop: asyncio.Event):
+    """Periodic housekeeping: hand back credit holds that outlived their timeout, e.g. of a worker
+    killed mid-job, and delete cached results past their TTL"""
+    while not stop.is_set():
+        try:
+            async with async_session_scope() as db:
+                reclaimed = await CreditLedger(db).reclaim()
+                await db.commit()
+            if reclaimed:
+                logger.warning("Reclaimed %s credits from expired holds", reclaimed)
+        except Exception as e:
+            logger.error("Credit hold sweep failed: %s", e, exc_info=True)
+        try:
+            purged = await get_result_cache().purge_expired()
+            if purged:
+                logger.info("Purged %s expired cached results", purged)
+        except Exception as e:
+            logger.error("Result cache purge failed: %s", e, exc_info=True)
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=settings.job_sweep_interval)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def main(concurrency: int):
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    if settings.schema_check_enabled:
+        await check_schema()
+    await open_http_clients()
+    # Model, Slack, cache and usage metrics are recorded here, so publish them for the API's /metrics
+    start_metrics_export()
+    logger.info("Starting %s job consumers", concurrency)
+    try:
+        # Consumers finish the job in hand before exiting
+        await asyncio.gather(sweep(stop), *(consume(stop) for _ in range(concurrency)))
+    finally:
+        await stop_metrics_export()
+        await close_http_clients()
+        await close_usage_recorder()
+        await close_async_engine()
+        logger.info("Job consumers stopped")
+        stop_logging()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=settings.job_worker_concurrency)
+    args = parser.parse_args()
+    # Log to stderr; app.log belongs to the API process
+    configure_logging(get_log_handler(filename=None))
+    asyncio.run(main(args.concurrency))
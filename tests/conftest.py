@@ -0,0 +1,4 @@
+from benchmarks import bench_env
+
+# Placeholder settings so src.config.Settings validates without a .env file
+bench_env()
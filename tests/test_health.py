@@ -0,0 +1,51 @@
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+
+from fastapi.testclient import TestClient
+
+from src.config import get_settings
+from src.main import app
+
+# Fails one model call against a closed port, which trips the OpenRouter breaker, then runs the worker
+WORKER = """
+import asyncio
+from src.services.paraphrase import ParaphraseService
+from src.worker import main
+
+async def run():
+    await ParaphraseService("U1").fix_text("Hello there", use_cache=False)
+    await main(1)
+
+asyncio.run(run())
+"""
+
+
+def test_health_reports_a_circuit_opened_in_the_worker(tmp_path, monkeypatch):
+    monkeypatch.setattr(get_settings(), "metrics_dir", str(tmp_path))
+    env = {
+        **os.environ,
+        "METRICS_DIR": str(tmp_path),
+        "METRICS_EXPORT_INTERVAL": "0.1",
+        "OPENROUTER_BASE_URL": "http://127.0.0.1:9",
+        "CIRCUIT_FAILURE_THRESHOLD": "1",
+        "CIRCUIT_RECOVERY_TIMEOUT": "60",
+    }
+    worker = subprocess.Popen([sys.executable, "-c", WORKER], env=env, stderr=subprocess.DEVNULL)
+    try:
+        snapshot = f"{socket.gethostname()}-{worker.pid}.json"
+        deadline = time.monotonic() + 10
+        while snapshot not in os.listdir(tmp_path):
+            assert time.monotonic() < deadline, "worker wrote no metrics snapshot"
+            time.sleep(0.05)
+
+        response = TestClient(app).get("/health")
+    finally:
+        worker.send_signal(signal.SIGTERM)
+        worker.wait(timeout=10)
+
+    assert response.status_code == 200
+    assert response.json() == {"status": "degraded", "circuits": {"127.0.0.1": "open"}}
@@ -0,0 +1,88 @@
+import asyncio
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+
+from src.config import get_settings
+from src.services.metrics import collect_metrics
+from src.utils.metrics import MetricsRegistry, merge_snapshots, read_snapshots, registry_snapshot, snapshot_name, write_snapshot
+
+
+def exited_pid() -> int:
+    process = subprocess.Popen([sys.executable, "-c", "pass"])
+    process.wait()
+    return process.pid
+
+
+def write_raw_snapshot(directory, name: str, host: str, pid: int, written_at: float, value: float):
+    registry = MetricsRegistry()
+    registry.counter("jobs_finished_total", "Job attempts").inc(value)
+    snapshot = {**registry_snapshot(registry), "host": host, "pid": pid, "written_at": written_at}
+    with open(os.path.join(directory, name), "w") as f:
+        json.dump(snapshot, f)
+
+
+def test_snapshots_of_exited_processes_are_dropped_and_deleted(tmp_path):
+    write_raw_snapshot(tmp_path, "dead.json", socket.gethostname(), exited_pid(), time.time(), 5)
+    write_raw_snapshot(tmp_path, "live.json", socket.gethostname(), os.getppid(), time.time(), 2)
+
+    snapshots = read_snapshots(str(tmp_path), max_age=15)
+
+    assert [snapshot["pid"] for snapshot in snapshots] == [os.getppid()]
+    assert sorted(os.listdir(tmp_path)) == ["live.json"]
+
+
+def test_snapshots_from_other_hosts_expire_by_age(tmp_path):
+    write_raw_snapshot(tmp_path, "stale.json", "other-host", 1, time.time() - 60, 5)
+    write_raw_snapshot(tmp_path, "fresh.json", "other-host", 1, time.time(), 2)
+
+    snapshots = read_snapshots(str(tmp_path), max_age=15)
+
+    families = merge_snapshots(snapshots)
+    assert families[0]["samples"] == [["jobs_finished_total", {}, 2]]
+    assert sorted(os.listdir(tmp_path)) == ["fresh.json"]
+
+
+def test_own_snapshot_is_not_read_back(tmp_path):
+    registry = MetricsRegistry()
+    registry.counter("jobs_finished_total", "Job attempts").inc()
+    write_snapshot(str(tmp_path), registry)
+
+    assert os.listdir(tmp_path) == [snapshot_name()]
+    assert read_snapshots(str(tmp_path), max_age=15) == []
+
+
+WORKER = """
+import asyncio
+from src.utils.metrics import REGISTRY
+from src.worker import main
+REGISTRY.counter("worker_test_total", "Recorded in the worker process").inc(3)
+asyncio.run(main(1))
+"""
+
+
+def wait_for(condition, timeout: float = 10.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.05)
+
+
+def test_worker_metrics_are_merged_into_api_metrics(tmp_path, monkeypatch):
+    monkeypatch.setattr(get_settings(), "metrics_dir", str(tmp_path))
+    env = {**os.environ, "METRICS_DIR": str(tmp_path), "METRICS_EXPORT_INTERVAL": "0.1", "JOB_POLL_INTERVAL": "0.1"}
+    worker = subprocess.Popen([sys.executable, "-c", WORKER], env=env, stderr=subprocess.DEVNULL)
+    try:
+        wait_for(lambda: f"{socket.gethostname()}-{worker.pid}.json" in os.listdir(tmp_path))
+
+        assert "worker_test_total 3.0" in asyncio.run(collect_metrics()).splitlines()
+    finally:
+        worker.send_signal(signal.SIGTERM)
+        worker.wait(timeout=10)
+
+    # The worker removes its snapshot on shutdown
+    assert os.listdir(tmp_path) == []
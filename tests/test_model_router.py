@@ -0,0 +1,27 @@
+import asyncio
+
+from src.services.model_router import ModelRouter
+from src.utils.circuit_breaker import CircuitOpenError
+
+
+def test_open_circuit_skips_a_model_without_counting_a_failure():
+    router = ModelRouter(["primary", "fallback"])
+
+    async def call(model: str, timeout: float):
+        if model == "primary":
+            raise CircuitOpenError("open")
+        return "rewritten"
+
+    assert asyncio.run(router.run(call)) == ("rewritten", "fallback")
+    assert list(router.stats["primary"].outcomes) == []
+    assert list(router.stats["fallback"].outcomes) == [True]
+
+
+def test_failed_call_counts_against_the_model():
+    router = ModelRouter(["primary", "fallback"])
+
+    async def call(model: str, timeout: float):
+        return None if model == "primary" else "rewritten"
+
+    assert asyncio.run(router.run(call)) == ("rewritten", "fallback")
+    assert list(router.stats["primary"].outcomes) == [False]
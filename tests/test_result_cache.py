@@ -0,0 +1,13 @@
+from src.services.result_cache import result_cache_key
+
+
+def key(operation: str, text: str, tone=None) -> str:
+    return result_cache_key(operation, text, tone, "model", f"{operation}.v1")
+
+
+def test_paraphrase_keys_ignore_whitespace_and_tone_case():
+    assert key("paraphrase", "hello  there\n", "Formal") == key("paraphrase", "hello there", "formal")
+
+
+def test_fix_keys_keep_whitespace():
+    assert key("fix", "hello  there") != key("fix", "hello there")
@@ -0,0 +1,62 @@
+import asyncio
+
+from src.utils.singleflight import SingleFlight
+
+
+class Refused(Exception):
+    pass
+
+
+def test_joined_callers_share_one_call():
+    flight = SingleFlight("test")
+    calls = 0
+
+    async def fn():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return "result"
+
+    async def main():
+        return await asyncio.gather(*(flight.do("key", fn) for _ in range(5)))
+
+    assert asyncio.run(main()) == ["result"] * 5
+    assert calls == 1
+
+
+def test_private_error_of_the_first_caller_is_not_shared():
+    flight = SingleFlight("test")
+    attempts = []
+
+    def call(caller: str):
+        async def fn():
+            attempts.append(caller)
+            await asyncio.sleep(0.01)
+            if caller == "refused":
+                raise Refused()
+            return caller
+        return fn
+
+    async def main():
+        first = asyncio.ensure_future(flight.do("key", call("refused"), private_errors=(Refused,)))
+        await asyncio.sleep(0)
+        second = flight.do("key", call("admitted"), private_errors=(Refused,))
+        return await asyncio.gather(first, second, return_exceptions=True)
+
+    first, second = asyncio.run(main())
+    assert isinstance(first, Refused)
+    assert second == "admitted"
+    assert attempts == ["refused", "admitted"]
+
+
+def test_other_errors_are_shared():
+    flight = SingleFlight("test")
+
+    async def fn():
+        await asyncio.sleep(0.01)
+        raise ValueError("upstream failed")
+
+    async def main():
+        return await asyncio.gather(*(flight.do("key", fn, private_errors=(Refused,)) for _ in range(2)), return_exceptions=True)
+
+    assert [type(result) for result in asyncio.run(main())] == [ValueError, ValueError]